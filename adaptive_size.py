@@ -0,0 +1,99 @@
+import time
+from collections import deque
+
+import numpy as np
+
+
+def parse_camera_sizes(items, n_cameras=None):
+    """['0=320', '2=960'] -> {0: 320, 2: 960}; n_cameras verilirse indeksler de doğrulanır."""
+    sizes = {}
+    for item in items or []:
+        try:
+            index, size = item.split('=')
+            sizes[int(index)] = int(size)
+        except ValueError:
+            raise ValueError(f"--camera-img-size: '{item}' 'kamera=boyut' biçiminde olmalı (örn. 0=320)") from None
+    if n_cameras is not None:
+        bad = sorted(i for i in sizes if not 0 <= i < n_cameras)
+        if bad:
+            raise ValueError(f'--camera-img-size: {bad} kamera indeksi yok, {n_cameras} yayın var (0-{n_cameras - 1})')
+    return sizes
+
+
+class AdaptiveImgSize:
+    """Kamera bazlı inference boyutu kontrolcüsü.
+
+    Takip edilen kişilerin tespit güveni `window` kare boyunca `conf_high` üstünde
+    kalır ve hiç track kaybolmazsa bir alt seviyeye iner. Ortalama güven `conf_low`
+    altına düşer ya da bir track kaybolursa bir üst seviyeye çıkar. Salınım olmasın
+    diye iki değişim arasında en az `cooldown` saniye beklenir.
+
+    Kayıp track: SORT'un sildiği (`max_age` kareden uzun süre görülmeyen) ve son
+    görüldüğünde kare kenarından `border` oranı kadar içeride olan track. Tek karelik
+    boşluklar ve kadrajdan çıkan kişiler kayıp sayılmaz.
+    """
+
+    def __init__(self, levels, start=None, conf_high=0.6, conf_low=0.4, window=30, cooldown=10.0,
+                 max_age=5, border=0.05):
+        self.levels = sorted(levels)
+        start = self.levels[-1] if start is None else start
+        self.level = int(np.argmin([abs(s - start) for s in self.levels]))
+        self.conf_high = conf_high
+        self.conf_low = conf_low
+        self.cooldown = cooldown
+        self.max_age = max_age  # tracker'ın max_age'i ile aynı olmalı
+        self.border = border
+        self.confs = deque(maxlen=window)  # kare başına kişi tespitlerinin ortalama güveni
+        self.lost = deque(maxlen=window)  # kare başına kaybolan track sayısı
+        self._last_change = 0.0
+        self._tracks = {}  # {track id: [görülmeyen kare sayısı, kare kenarına yakın mı]}
+
+    def _count_lost(self, tracked_dets, frame_shape):
+        h, w = frame_shape[:2]
+        mx, my = w * self.border, h * self.border
+        seen = set()
+        for x1, y1, x2, y2, track_id in tracked_dets[:, [0, 1, 2, 3, 8]] if len(tracked_dets) else ():
+            at_edge = bool(x1 <= mx or y1 <= my or x2 >= w - mx or y2 >= h - my)
+            self._tracks[int(track_id)] = [0, at_edge]
+            seen.add(int(track_id))
+
+        lost = 0
+        for track_id in list(self._tracks):
+            if track_id in seen:
+                continue
+            state = self._tracks[track_id]
+            state[0] += 1
+            if state[0] > self.max_age:
+                del self._tracks[track_id]
+                lost += not state[1]
+        return lost
+
+    @property
+    def size(self):
+        return self.levels[self.level]
+
+    def update(self, person_confs, tracked_dets, frame_shape, now_ts=None):
+        """Bir karenin sonucunu (SORT çıktısı: 0-3 kutu, 8 id) işler; boyut değiştiyse True döner."""
+        now_ts = time.time() if now_ts is None else now_ts
+        lost = self._count_lost(tracked_dets, frame_shape)
+        if len(person_confs):
+            self.confs.append(float(np.mean(person_confs)))
+        self.lost.append(lost)
+
+        if now_ts - self._last_change < self.cooldown:
+            return False
+
+        step = 0
+        if self.level < len(self.levels) - 1 and (lost or (self.confs and np.mean(self.confs) < self.conf_low)):
+            step = 1
+        elif self.level > 0 and len(self.confs) == self.confs.maxlen and not any(self.lost) \
+                and min(self.confs) >= self.conf_high:
+            step = -1
+        if not step:
+            return False
+
+        self.level += step
+        self.confs.clear()
+        self.lost.clear()
+        self._last_change = now_ts
+        return True
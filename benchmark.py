@@ -0,0 +1,320 @@
+import time
+import argparse
+
+import numpy as np
+import torch
+
+from detection_utils import dets_to_sort_array, class_counts_str
+
+
+# =========================
+#   YARDIMCILAR
+# =========================
+
+def timeit(fn, repeat=200):
+    """fn'in çağrı başına ortalama süresini (ms) döndürür."""
+    fn()  # ısınma
+    t = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return 1E3 * (time.perf_counter() - t) / repeat
+
+
+def random_det(n, nc=80, size=640):
+    """NMS çıktısı gibi (n, 6) rastgele tespit tensörü üretir."""
+    xy = torch.rand(n, 2) * size
+    wh = torch.rand(n, 2) * size / 4
+    conf = torch.rand(n, 1)
+    cls = torch.randint(0, nc, (n, 1)).float()
+    return torch.cat((xy, xy + wh, conf, cls), 1)
+
+
+# =========================
+#   DETS -> SORT DÖNÜŞÜMÜ
+# =========================
+
+def _dets_to_sort_vstack(det):
+    # Eski döngü: her tespit için dizi yeniden oluşturuluyordu
+    dets_to_sort = np.empty((0, 6))
+    for *xyxy, conf, detclass in det.cpu().detach().numpy():
+        dets_to_sort = np.vstack(
+            (dets_to_sort, np.array([xyxy[0], xyxy[1], xyxy[2], xyxy[3], conf, detclass]))
+        )
+    return dets_to_sort
+
+
+def _class_counts_loop(det, names):
+    # Eski döngü: her sınıf için tüm tensör yeniden taranıyordu
+    s = ''
+    for c in det[:, -1].unique():
+        n = (det[:, -1] == c).sum()
+        if int(c) == 0 and n > 1:
+            n = 1
+        s += f"{n} {names[int(c)]}{'s' * (n > 1)}, "
+    return s
+
+
+def bench_dets(opt):
+    names = [f'class{i}' for i in range(80)]
+    print(f"{'n_det':>6} | {'vstack (ms)':>12} | {'slice (ms)':>10} | {'log loop (ms)':>13} | {'log unique (ms)':>15}")
+    print('-' * 70)
+    for n in opt.sizes:
+        det = random_det(n)
+        assert np.array_equal(_dets_to_sort_vstack(det), dets_to_sort_array(det))
+        t_old = timeit(lambda: _dets_to_sort_vstack(det), opt.repeat)
+        t_new = timeit(lambda: dets_to_sort_array(det), opt.repeat)
+        t_log_old = timeit(lambda: _class_counts_loop(det, names), opt.repeat)
+        t_log_new = timeit(lambda: class_counts_str(det, names), opt.repeat)
+        print(f'{n:>6} | {t_old:>12.3f} | {t_new:>10.3f} | {t_log_old:>13.3f} | {t_log_new:>15.3f}')
+
+
+# =========================
+#   MODEL BAŞLATMA (COLD / WARM)
+# =========================
+
+def bench_startup(opt):
+    import tempfile
+    from models.experimental import attempt_load
+    from utils.torch_utils import select_device, TracedModel
+    from model_cache import load_traced_model
+
+    device = select_device(opt.device)
+    x = torch.zeros(1, 3, opt.img_size, opt.img_size).to(device)
+
+    def first_inference(model):
+        model(x)
+
+    t = time.time()
+    model = TracedModel(attempt_load(opt.weights, map_location=device), device, opt.img_size)
+    first_inference(model)
+    t_nocache = time.time() - t
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        t = time.time()
+        first_inference(load_traced_model(opt.weights, device, opt.img_size, cache_dir=cache_dir))
+        t_cold = time.time() - t
+
+        t = time.time()
+        first_inference(load_traced_model(opt.weights, device, opt.img_size, cache_dir=cache_dir))
+        t_warm = time.time() - t
+
+    print(f"{'start':<10} | {'load + 1st inference (s)':>25}")
+    print('-' * 40)
+    print(f"{'no cache':<10} | {t_nocache:>25.2f}")
+    print(f"{'cold':<10} | {t_cold:>25.2f}")
+    print(f"{'warm':<10} | {t_warm:>25.2f}")
+
+
+# =========================
+#   TRACKER (sort.Sort / VectorSort)
+# =========================
+
+def synthetic_tracks(n, frames, size=1920, miss=0.1, seed=0):
+    """Sabit hızla gezinen n kişinin gürültülü, arada kaçırılan tespitleri: [(k, 6) dizi]"""
+    rng = np.random.default_rng(seed)
+    xy = rng.random((n, 2)) * size
+    v = rng.normal(0, 3, (n, 2))
+    wh = rng.uniform(30, 120, (n, 2))
+    out = []
+    for _ in range(frames):
+        xy += v
+        xy %= size
+        keep = rng.random(n) > miss
+        box = np.concatenate((xy, xy + wh), 1) + rng.normal(0, 1.5, (n, 4))
+        conf = rng.uniform(0.3, 1.0, (n, 1))
+        out.append(np.concatenate((box, conf, np.zeros((n, 1))), 1)[keep])
+    return out
+
+
+def bench_tracker(opt):
+    """Aynı tespit dizisini sort.Sort ve VectorSort'tan geçirir: kare başı süre ve ID eşitliği."""
+    import sort
+    from vsort import VectorSort
+
+    scenes = []
+    if opt.dets:
+        # Kayıtlı klipten kare başına (n, 6) tespitler: np.savez(path, *frames)
+        data = np.load(opt.dets)
+        scenes.append(('recorded', [data[k] for k in sorted(data.files, key=lambda k: int(k.split('_')[-1]))]))
+    scenes += [(f'synthetic n={n}', synthetic_tracks(n, opt.frames)) for n in opt.sizes]
+
+    print(f"{'scene':<18} | {'sort (ms)':>9} | {'vsort (ms)':>10} | {'speedup':>7} | {'ids':>9}")
+    print('-' * 66)
+    for name, frames in scenes:
+        sort.KalmanBoxTracker.count = VectorSort.count = 0
+        ref, new = sort.Sort(opt.max_age, opt.min_hits, opt.iou_thres), VectorSort(opt.max_age, opt.min_hits, opt.iou_thres)
+        t_ref = t_new = 0.0
+        same = True
+        for dets in frames:
+            t = time.perf_counter()
+            a = ref.update(dets)
+            t_ref += time.perf_counter() - t
+            t = time.perf_counter()
+            b = new.update(dets)
+            t_new += time.perf_counter() - t
+            same &= a.shape == b.shape and np.array_equal(a[:, 8], b[:, 8]) if len(a) or len(b) else True
+        n = len(frames)
+        print(f'{name:<18} | {1E3 * t_ref / n:>9.3f} | {1E3 * t_new / n:>10.3f} | {t_ref / t_new:>6.1f}x | '
+              f'{"identical" if same else "DIFFER":>9}')
+
+
+# =========================
+#   HEADLESS / GÖRSEL KARŞILAŞTIRMA
+# =========================
+
+def bench_headless(opt):
+    """detect()'in kamera başına inference sonrası işini görselli ve --headless olarak ölçer."""
+    from pathlib import Path
+    from sort import Sort
+    from detect_and_track import CameraOccupancy, draw_boxes, draw_countdown, countdown_tint
+
+    names = [f'class{i}' for i in range(80)]
+    h, w = opt.frame_size
+    im0s = np.random.randint(0, 255, (h, w, 3), dtype=np.uint8)
+    save_dir = Path('runs/detect/exp')
+    tint_cache = {}
+
+    def run(n, headless):
+        tracker, occupancy = Sort(max_age=5, min_hits=2, iou_threshold=0.2), CameraOccupancy()
+        dets = [random_det(n, size=min(h, w)) for _ in range(opt.frames)]
+        dets[0][:, 5] = 0  # ilk karede kişiler var ki countdown ve occupancy çalışsın
+
+        def frame_loop():
+            for k, det in enumerate(dets):
+                raw = int((det[:, 5] == 0).any())
+                if headless:
+                    tracked = tracker.update(dets_to_sort_array(det))
+                    occupancy.update(raw, k * 0.1)
+                    continue
+                im0 = im0s.copy()
+                p = Path('http://camera/stream')
+                save_path, txt_path = str(save_dir / p.name), str(save_dir / 'labels' / p.stem) + f'_{k}'
+                s = '0: ' + class_counts_str(det, names)
+                tracked = tracker.update(dets_to_sort_array(det))
+                if len(tracked):
+                    draw_boxes(im0, tracked[:, :4], tracked[:, 8], tracked[:, 4], names, False, txt_path)
+                _, countdown, remain = occupancy.update(raw, k * 0.1)
+                if countdown:
+                    draw_countdown(im0, remain, countdown_tint(tint_cache, im0.shape))
+                s += f'Done. RawCount={raw} ({save_path})'
+
+        t = time.perf_counter()
+        frame_loop()
+        return 1E3 * (time.perf_counter() - t) / opt.frames
+
+    print(f"{'n_det':>6} | {'visual (ms/frame)':>17} | {'headless (ms/frame)':>19} | {'saved':>6}")
+    print('-' * 60)
+    for n in opt.sizes:
+        t_vis, t_head = run(n, False), run(n, True)
+        print(f'{n:>6} | {t_vis:>17.3f} | {t_head:>19.3f} | {1 - t_head / t_vis:>6.0%}')
+
+
+# =========================
+#   OFFLINE REPLAY
+# =========================
+
+def bench_replay(opt, detect_args):
+    """Klipleri N sanal kamera olarak aynı detect() döngüsünden geçirir, MySQL yerine SQLite."""
+    import json
+    import detect_and_track
+    from stream_batcher import ReplayStreams
+    from occupancy_writer import SqliteOccupancyWriter
+
+    det_opt = detect_and_track.parse_opt(['--source', 'replay', '--nosave', '--metrics-interval', '0',
+                                          *detect_args])
+    detect_and_track.opt = det_opt
+    sink = SqliteOccupancyWriter(opt.sqlite)
+    replay = {}
+
+    def make_dataset(imgsz, stride):
+        replay['dataset'] = ReplayStreams(opt.clips, opt.streams, opt.fps, imgsz, stride, opt.duration, opt.max_frames)
+        return replay['dataset']
+
+    t = time.time()
+    summary = detect_and_track.detect(make_dataset=make_dataset, db_writer=sink)
+    wall = time.time() - t
+    dataset = replay['dataset']
+
+    dropped = sum(dataset.dropped.values())
+    report = {
+        'streams': opt.streams,
+        'target_fps': opt.fps,
+        'wall_s': round(wall, 2),
+        'sustained_fps_per_stream': round(dataset.served / opt.streams / opt.duration, 2),
+        'sustained_fps_total': round(dataset.served / opt.duration, 2),
+        'dropped_frames': dropped,
+        'dropped_ratio': round(dropped / max(1, dropped + dataset.served), 4),
+        'transitions': {cam: len(rows) for cam, rows in sink.transitions().items()},
+        'detect_args': detect_args,
+        'stage_latency_ms': summary,
+    }
+    sink.close()
+
+    print(f"{'stage':<14} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'p99 (ms)':>9}")
+    print('-' * 50)
+    stages = {}
+    for cam in summary.values():
+        for stage, st in cam.items():
+            stages.setdefault(stage, []).append(st)
+    for stage, sts in stages.items():
+        # Kameralar arasında en kötü değer
+        print(f"{stage:<14} | " + ' | '.join(f"{max(st[f'p{q}'] for st in sts):>9.2f}" for q in (50, 95, 99)))
+    print(f"FPS: {report['sustained_fps_total']:.1f} toplam, {report['sustained_fps_per_stream']:.1f}/kamera "
+          f"(hedef {opt.fps:g}), atılan kare: {dropped} ({report['dropped_ratio']:.1%})")
+
+    if opt.out:
+        with open(opt.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Rapor: {opt.out}')
+
+
+# =========================
+#   MAIN
+# =========================
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='bench', required=True)
+
+    p = sub.add_parser('dets', help='per-frame detection -> SORT conversion and log string overhead')
+    p.add_argument('--sizes', nargs='+', type=int, default=[5, 10, 25, 50, 100, 200, 300], help='detections per frame')
+    p.add_argument('--repeat', type=int, default=200, help='calls per measurement')
+    p.set_defaults(func=bench_dets)
+
+    p = sub.add_parser('startup', help='traced model load time: no cache vs cold vs warm cache')
+    p.add_argument('--weights', nargs='+', type=str, default='yolov7.pt', help='model.pt path(s)')
+    p.add_argument('--img-size', type=int, default=640, help='inference size (pixels)')
+    p.add_argument('--device', default='', help='cuda device, i.e. 0 or 0,1,2,3 or cpu')
+    p.set_defaults(func=bench_startup)
+
+    p = sub.add_parser('tracker', help='sort.Sort vs vectorized VectorSort: time per frame and track IDs')
+    p.add_argument('--dets', type=str, default='', help='recorded per-frame detections (.npz of (n, 6) arrays)')
+    p.add_argument('--sizes', nargs='+', type=int, default=[5, 20, 100, 300], help='synthetic persons per frame')
+    p.add_argument('--frames', type=int, default=300, help='synthetic frames per scene')
+    p.add_argument('--max-age', type=int, default=5)
+    p.add_argument('--min-hits', type=int, default=2)
+    p.add_argument('--iou-thres', type=float, default=0.2)
+    p.set_defaults(func=bench_tracker)
+
+    p = sub.add_parser('headless', help='per-camera post-inference cost with drawing vs --headless')
+    p.add_argument('--sizes', nargs='+', type=int, default=[1, 5, 20, 50], help='detections per frame')
+    p.add_argument('--frames', type=int, default=300, help='frames per measurement')
+    p.add_argument('--frame-size', nargs=2, type=int, default=[1080, 1920], help='camera frame height width')
+    p.set_defaults(func=bench_headless)
+
+    p = sub.add_parser('replay', help='replay clips as N simulated streams through detect(), SQLite sink',
+                       epilog='unrecognised arguments are passed to detect_and_track (e.g. --backend, --img-size)')
+    p.add_argument('--clips', nargs='*', default=[], help='recorded clips (default: synthetic frames)')
+    p.add_argument('--streams', type=int, default=4, help='number of simulated cameras')
+    p.add_argument('--fps', type=float, default=15.0, help='per-camera replay FPS')
+    p.add_argument('--duration', type=float, default=30.0, help='replay length (seconds)')
+    p.add_argument('--max-frames', type=int, default=300, help='frames decoded per clip')
+    p.add_argument('--sqlite', type=str, default=':memory:', help='SQLite database for occupancy rows')
+    p.add_argument('--out', type=str, default='', help='write the JSON report here')
+    p.set_defaults(func=bench_replay)
+
+    opt, extra = parser.parse_known_args()
+    if extra and opt.bench != 'replay':
+        parser.error(f'unrecognized arguments: {" ".join(extra)}')
+    with torch.no_grad():
+        opt.func(opt, extra) if opt.bench == 'replay' else opt.func(opt)
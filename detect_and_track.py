@@ -2,6 +2,7 @@ import os
 import cv2
 import time
 import torch
+import json
 import argparse
 from pathlib import Path
 import numpy as np
@@ -26,10 +27,23 @@ from utils.plots import plot_one_box
 from utils.torch_utils import select_device, load_classifier, \
     time_synchronized, TracedModel
 from utils.download_weights import download
+from stream_batcher import BatchedStreams, HeadlessLoadStreams
+from motion_gate import MotionGate
+from seat_roi import load_seat_rois
+from seat_state import SeatStateEngine, BELONGING_CLASSES
+from multicam import MultiCamAssociator, load_homographies
+from occupancy_writer import OccupancyWriter
+from detection_utils import dets_to_sort_array, class_counts_str
+from stage_metrics import StageMetrics
+from inference_backends import OnnxRuntimeBackend
+from model_cache import load_traced_model
+from video_writer import AsyncVideoWriter, AsyncImageWriter
+from adaptive_size import AdaptiveImgSize, parse_camera_sizes
 
 # For SORT tracking
 import skimage
 from sort import *
+from vsort import VectorSort
 
 # --- MYSQL AYARLARI ---
 DB_CONFIG = {
@@ -65,8 +79,10 @@ def init_mysql_table():
         cursor_server.close()
         cnx_server.close()
 
-        # 2) Artık DB ile bağlanıp tabloyu yarat / güncelle
-        cnx_db = mysql.connector.connect(**DB_CONFIG)
+        # 2) Artık DB ile bağlanıp tabloyu yarat / güncelle.
+        # raise_on_warnings açıkken tablo zaten varsa CREATE TABLE IF NOT EXISTS bile 1050
+        # notu yüzünden hata fırlatır ve sonraki tablolar hiç oluşmaz; DDL uyarısız bağlantıda.
+        cnx_db = mysql.connector.connect(**{**DB_CONFIG, 'raise_on_warnings': False})
         cursor_db = cnx_db.cursor()
 
         # Eğer tablo yoksa, doğru şemayla oluştur
@@ -79,6 +95,29 @@ def init_mysql_table():
         )
         """
         cursor_db.execute(table_query)
+
+        # Canlı okumalar için kamera başına son durum (OccupancyWriter upsert eder)
+        cursor_db.execute("""
+        CREATE TABLE IF NOT EXISTS current_occupancy (
+            camera_id VARCHAR(255) NOT NULL PRIMARY KEY,
+            person_count INT NOT NULL,
+            updated_at DATETIME NOT NULL
+        )
+        """)
+
+        # Koltuk durum geçişleri (free / occupied / held / abandoned)
+        cursor_db.execute("""
+        CREATE TABLE IF NOT EXISTS seat_events (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            event_time DATETIME NOT NULL,
+            camera_id VARCHAR(255) NOT NULL,
+            seat_id VARCHAR(64) NOT NULL,
+            state VARCHAR(16) NOT NULL,
+            prev_state VARCHAR(16) NOT NULL,
+            dwell_s FLOAT NOT NULL,
+            INDEX idx_seat_time (camera_id, seat_id, event_time)
+        )
+        """)
         cnx_db.commit()
 
         # Eski tabloysa ve camera_id kolonu yoksa, ALTER TABLE ile ekle
@@ -95,6 +134,16 @@ def init_mysql_table():
             else:
                 raise
 
+        # İlk kurulumda current_occupancy'yi geçmişteki son kayıtlarla doldur
+        cursor_db.execute("SELECT COUNT(*) FROM current_occupancy")
+        if cursor_db.fetchone()[0] == 0:
+            cursor_db.execute("""
+            INSERT IGNORE INTO current_occupancy (camera_id, person_count, updated_at)
+            SELECT camera_id, person_count, record_date FROM person_logs
+            WHERE id IN (SELECT MAX(id) FROM person_logs GROUP BY camera_id)
+            """)
+            cnx_db.commit()
+
         cursor_db.close()
         cnx_db.close()
 
@@ -105,28 +154,54 @@ def init_mysql_table():
         print("MySQL sunucusu / DB erişimiyle ilgili bir sıkıntı olabilir.")
 
 
-def save_to_mysql(count, camera_id):
-    """Kişi sayısını (0/1) MySQL'e kaydeder (kamera bazlı)."""
-    try:
-        cnx = mysql.connector.connect(**DB_CONFIG)
-        cursor = cnx.cursor()
+# =========================
+#   TRACKER
+# =========================
 
-        add_log = ("INSERT INTO person_logs "
-                   "(record_date, camera_id, person_count) "
-                   "VALUES (%s, %s, %s)")
+SORT_MAX_AGE = 5  # bu kadar kare eşleşmeyen track silinir
 
-        now = datetime.now()
-        data_log = (now, camera_id, count)
 
-        cursor.execute(add_log, data_log)
-        cnx.commit()
+def make_tracker():
+    """Kamera başına tracker: sort.Sort ya da aynı ID'leri üreten vektörel VectorSort."""
+    tracker = VectorSort if opt.tracker == 'vsort' else Sort
+    return tracker(max_age=SORT_MAX_AGE, min_hits=2, iou_threshold=0.2)
 
-        cursor.close()
-        cnx.close()
-        print(f"--> MySQL Kayıt: Kamera={camera_id}, Zaman={now}, Kişi(0/1)={count}")
 
-    except mysql.connector.Error as err:
-        print(f"MySQL Kayıt Hatası: {err}")
+# =========================
+#   OCCUPANCY (0/1 + COUNTDOWN)
+# =========================
+
+OCCUPANCY_TIMEOUT = 10.0  # saniye
+
+
+class CameraOccupancy:
+    """Bir kameranın 0/1 doluluk durumu: kişi görünmeyince OCCUPANCY_TIMEOUT kadar geri sayar."""
+
+    def __init__(self, timeout=OCCUPANCY_TIMEOUT):
+        self.timeout = timeout
+        self.state = 0
+        self.last_seen = None
+
+    def update(self, raw_count, now_ts):
+        """Dönen değer: (occupancy 0/1, countdown aktif mi, kalan saniye)"""
+        countdown_active = False
+        countdown_remain = 0.0
+
+        if raw_count > 0:
+            self.state = 1
+            self.last_seen = now_ts
+        elif self.state == 1:
+            if self.last_seen is None:
+                self.last_seen = now_ts
+            else:
+                elapsed = now_ts - self.last_seen
+                if elapsed < self.timeout:
+                    countdown_active = True
+                    countdown_remain = self.timeout - elapsed
+                else:
+                    self.state = 0
+
+        return self.state, countdown_active, countdown_remain
 
 
 # =========================
@@ -173,65 +248,221 @@ def draw_boxes(
     return img
 
 
+COUNTDOWN_ALPHA = 0.35
+
+
+def countdown_tint(cache, shape):
+    """Countdown için kırmızı overlay tamponu; her kare boyutu için bir kez ayrılır."""
+    tint = cache.get(shape)
+    if tint is None:
+        tint = cache[shape] = np.empty(shape, dtype=np.uint8)
+        tint[:] = (0, 0, 255)
+    return tint
+
+
+def draw_countdown(im0, countdown_remain, tint=None):
+    """Kişi ayrılırken kareyi kırmızıya boyar ve kalan saniyeyi yazar.
+
+    Karışım im0 üzerinde yerinde yapılır; `tint` verilmezse geçici tampon ayrılır.
+    """
+    h, w = im0.shape[:2]
+    if tint is None:
+        tint = countdown_tint({}, im0.shape)
+    cv2.addWeighted(im0, 1 - COUNTDOWN_ALPHA, tint, COUNTDOWN_ALPHA, 0, dst=im0)
+
+    sec_left = int(countdown_remain) + 1
+    text = f"LEAVING IN {sec_left}s"
+    (tw, th), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 1.2, 2)
+    cx, cy = w // 2, h // 2
+    cv2.putText(
+        im0,
+        text,
+        (cx - tw // 2, cy),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        1.2,
+        (255, 255, 255),
+        2,
+        cv2.LINE_AA
+    )
+
+
+# =========================
+#   MODEL / INFERENCE
+# =========================
+
+def load_model():
+    """opt'a göre modeli yükler: (model, device, half, stride, imgsz)"""
+    ort_backend = opt.backend == 'onnxruntime' or opt.int8
+    device = select_device('cpu' if ort_backend else opt.device)
+    half = device.type != 'cpu'
+
+    if ort_backend:
+        # NMS grafiğe gömülü ve sınıf bazlı; agnostic NMS bu yolda uygulanamaz
+        assert not opt.agnostic_nms, '--agnostic-nms onnxruntime/--int8 backend ile desteklenmiyor (NMS grafiğin içinde)'
+        # NMS'li End2End ONNX grafiği, ağırlık özeti + img size ile önbelleğe alınır
+        model = OnnxRuntimeBackend(opt.weights, opt.img_size, opt.conf_thres, opt.iou_thres,
+                                   cache_dir=opt.onnx_cache, threads=opt.ort_threads, int8=opt.int8)
+        half = False
+    elif not opt.no_trace:
+        # Fuse + trace edilmiş model ağırlık özeti, img size ve torch sürümüyle diskte saklanır
+        model = load_traced_model(opt.weights, device, opt.img_size, cache_dir=opt.trace_cache)
+    else:
+        model = attempt_load(opt.weights, map_location=device)
+    stride = int(model.stride.max())
+    imgsz = check_img_size(opt.img_size, s=stride)
+
+    if ort_backend:
+        # Grafikler sabit boyutlu: döngüde görülecek her boyut şimdi hazırlanır / doğrulanır
+        model.prepare(inference_sizes(imgsz, stride))
+
+    if half:
+        model.half()
+    return model, device, half, stride, imgsz
+
+
+def seat_rois_path():
+    """--seat-rois ya da streams.txt yanındaki seat_rois.json"""
+    return opt.seat_rois or (str(Path(opt.source).with_name('seat_rois.json')) if opt.source.endswith('.txt') else '')
+
+
+def inference_sizes(imgsz, stride):
+    """opt'a göre modele girebilecek tüm kare kenarları (ana boyut, koltuk kırpıntıları,
+    kamera bazlı ve otomatik boyut seviyeleri)."""
+    sizes = {imgsz}
+    if Path(seat_rois_path()).is_file():
+        sizes.add(check_img_size(opt.roi_img_size, s=stride))
+    sizes |= {check_img_size(size, s=stride) for size in parse_camera_sizes(opt.camera_img_size).values()}
+    if opt.auto_img_size:
+        sizes |= {check_img_size(size, s=stride) for size in opt.img_size_levels}
+    return sizes
+
+
+def infer_batch(model, img, device, half, classes=None):
+    """uint8 batch'i modelden ve NMS'ten geçirir.
+
+    Dönen değer: (kare başına det listesi, modele giren img, inference süresi, NMS süresi).
+    ONNX Runtime backend'inde NMS grafiğin içindedir ve PyTorch hiç kullanılmaz.
+    `classes` verilmezse opt.classes kullanılır.
+    """
+    classes = classes or opt.classes
+    if isinstance(model, OnnxRuntimeBackend):
+        img = model.preprocess(img)
+        t1 = time.time()
+        pred = model(img, classes=classes)
+        return pred, img, time.time() - t1, 0.0
+
+    img = torch.from_numpy(img).to(device)
+    img = img.half() if half else img.float()
+    img /= 255.0
+    if img.ndimension() == 3:
+        img = img.unsqueeze(0)
+
+    t1 = time_synchronized()
+    pred = model(img, augment=opt.augment)[0]
+    t2 = time_synchronized()
+    pred = non_max_suppression(pred, opt.conf_thres, opt.iou_thres, classes=classes,
+                               agnostic=opt.agnostic_nms)
+    return pred, img, t2 - t1, time_synchronized() - t2
+
+
 # =========================
 #   ANA DETECT FONKSİYONU
 # =========================
 
-def detect(save_img=False):
-    # MySQL veritabanını kontrol et / oluştur
-    init_mysql_table()
+def detect(save_img=False, make_dataset=None, db_writer=None):
+    """Ana döngü. Replay/benchmark için kaynak yerine `make_dataset(imgsz, stride)` ile
+    kurulan dataset, MySQL yerine `db_writer` kullanılabilir. Kamera/aşama bazlı gecikme
+    özetini döndürür."""
+    if db_writer is None:
+        # MySQL veritabanını kontrol et / oluştur
+        init_mysql_table()
+
+        # Kayıtlar inference döngüsünü bekletmeden arka planda toplu yazılır
+        db_writer = OccupancyWriter(DB_CONFIG, batch_size=opt.db_batch_size, flush_interval=opt.db_flush_interval,
+                                    spool_path=opt.db_spool)
 
     source, weights, view_img, save_txt, imgsz, trace, colored_trk, save_bbox_dim, save_with_object_id = \
         opt.source, opt.weights, opt.view_img, opt.save_txt, opt.img_size, not opt.no_trace, \
             opt.colored_trk, opt.save_bbox_dim, opt.save_with_object_id
 
     save_img = not opt.nosave and not source.endswith('.txt')
-    webcam = source.isnumeric() or source.endswith('.txt') or source.lower().startswith(
+    headless = opt.headless  # çizim, metin formatlama ve pencere yok
+    if headless:
+        view_img = save_img = save_txt = save_with_object_id = False
+    webcam = make_dataset is not None or source.isnumeric() or source.endswith('.txt') or source.lower().startswith(
         ('rtsp://', 'rtmp://', 'http://', 'https://'))
 
     # Her kamera için ayrı tracker tutan sözlük
     sort_trackers_dict = {}
 
     save_dir = Path(increment_path(Path(opt.project) / opt.name, exist_ok=opt.exist_ok))
-    (save_dir / 'labels' if save_txt or save_with_object_id else save_dir).mkdir(parents=True, exist_ok=True)
+    if not headless:
+        (save_dir / 'labels' if save_txt or save_with_object_id else save_dir).mkdir(parents=True, exist_ok=True)
 
     set_logging()
-    device = select_device(opt.device)
-    half = device.type != 'cpu'
+    model, device, half, stride, imgsz = load_model()
+    ort_backend = isinstance(model, OnnxRuntimeBackend)
 
-    model = attempt_load(weights, map_location=device)
-    stride = int(model.stride.max())
-    imgsz = check_img_size(imgsz, s=stride)
-
-    if trace:
-        model = TracedModel(model, device, opt.img_size)
-    if half:
-        model.half()
-
-    if webcam:
-        view_img = check_imshow()
+    if make_dataset is not None:
+        dataset = make_dataset(imgsz, stride)
+        cudnn.benchmark = True
+    elif webcam:
+        view_img = not headless and check_imshow()
         cudnn.benchmark = True
-        dataset = LoadStreams(source, img_size=imgsz, stride=stride)
+        if opt.batch_deadline > 0 or opt.latest_frame or opt.camera_img_size or opt.auto_img_size:
+            # Her kameranın en yeni karesi; hazır olanlar deadline içinde tek batch'te çalışır
+            dataset = BatchedStreams(source, img_size=imgsz, stride=stride, deadline=opt.batch_deadline / 1E3,
+                                     check_quit=not headless)
+        else:
+            # Headless yakalamayı değiştirmez, sadece 'q' kontrolünü (cv2.waitKey) kapatır
+            dataset = (HeadlessLoadStreams if headless else LoadStreams)(source, img_size=imgsz, stride=stride)
     else:
         dataset = LoadImages(source, img_size=imgsz, stride=stride)
 
     names = model.module.names if hasattr(model, 'module') else model.names
 
+    # Koltuk ROI'leri: varsa bu kameralar tam kare yerine sadece masa kırpıntılarıyla çalışır
+    seat_rois = load_seat_rois(seat_rois_path(), getattr(dataset, 'sources', [source]))
+    roi_imgsz = check_img_size(opt.roi_img_size, s=stride)
+
+    # Örtüşen kameralar: zemin planında tekilleştirilen kişiler tek bir kameraya sayılır
+    homographies = load_homographies(opt.homographies, getattr(dataset, 'sources', [source]))
+    associator = MultiCamAssociator(homographies, radius=opt.multicam_radius) if homographies else None
+    last_unique = -1
+
+    # Kamera bazlı inference boyutu: aynı boyuttaki kameralar yine tek batch'te çalışır
+    camera_sizes = {i: check_img_size(size, s=stride) for i, size in
+                    parse_camera_sizes(opt.camera_img_size, len(getattr(dataset, 'sources', [source]))).items()}
+    adaptive = {}  # {kamera_index: AdaptiveImgSize}
+    if opt.auto_img_size:
+        levels = sorted({check_img_size(size, s=stride) for size in opt.img_size_levels})
+        adaptive = {i: AdaptiveImgSize(levels, start=camera_sizes.get(i, imgsz), max_age=SORT_MAX_AGE)
+                    for i in range(len(getattr(dataset, 'sources', [])))}
+        camera_sizes = {i: a.size for i, a in adaptive.items()}
+    for i, size in camera_sizes.items():
+        if hasattr(dataset, 'set_img_size') and size != imgsz:
+            dataset.set_img_size(i, size)
+            print(f'[Kamera={i}] Inference boyutu: {size}')
+
     if opt.classes and 0 not in opt.classes:
         print("UYARI: Sadece insan (class 0) aranmalı.")
     elif not opt.classes:
         opt.classes = [0]
 
-    if device.type != 'cpu':
+    # Koltuk durum makinesi: ROI kameralarında kişiye ek olarak eşyalar da aranır
+    seat_classes = sorted(set(opt.classes) | set(opt.belongings_classes))
+    seat_engines = {i: SeatStateEngine(roi.seats, opt.belongings_classes, person_grace=opt.seat_person_grace,
+                                       hold_timeout=opt.seat_hold_timeout, free_timeout=opt.seat_free_timeout)
+                    for i, roi in seat_rois.items()}
+
+    if device.type != 'cpu' and not ort_backend:
         model(torch.zeros(1, 3, imgsz, imgsz).to(device).type_as(next(model.parameters())))
 
     t0 = time.time()
 
     # Kamera bazlı occupancy state ve last seen time
     last_person_count = {}  # {camera_id: 0/1}
-    occupancy_state = {}  # {camera_id: 0/1}
-    last_seen_time = {}  # {camera_id: timestamp}
-    OCCUPANCY_TIMEOUT = 10.0  # saniye
+    occupancy = {}  # {camera_id: CameraOccupancy}
 
     # Her kamera için farklı kutu rengi
     camera_colors = {}
@@ -242,76 +473,163 @@ def detect(save_img=False):
         (255, 255, 0),  # sarı
     ]
 
-    vid_path, vid_writer = None, None
+    # Görüntü ne gösteriliyor ne kaydediliyorsa kutu/overlay çizimi tamamen atlanır
+    render = view_img or save_img
+    tint_cache = {}  # {kare boyutu: countdown overlay tamponu}
 
-    for path, img, im0s, vid_cap in dataset:
-        img = torch.from_numpy(img).to(device)
-        img = img.half() if half else img.float()
-        img /= 255.0
-        if img.ndimension() == 3:
-            img = img.unsqueeze(0)
+    # Kayıt arka planda encode edilir, döngü sadece kuyruğa kare bırakır
+    vid_writers = {}  # {save_path: AsyncVideoWriter}
+    img_writer = None
 
-        t1 = time_synchronized()
-        pred = model(img, augment=opt.augment)[0]
-        t2 = time_synchronized()
-        pred = non_max_suppression(pred, opt.conf_thres, opt.iou_thres, classes=opt.classes,
-                                   agnostic=opt.agnostic_nms)
-        t3 = time_synchronized()
+    # Kamera bazlı hareket kontrolü ve model atlandığında taşınan son tespitler
+    motion_gates = {}  # {kamera_index: MotionGate}
+    last_det = {}  # {kamera_index: im0 koordinatlarında det}
 
-        for i, det in enumerate(pred):
-            # Her kamera için tracker kontrolü/oluşturma
-            if i not in sort_trackers_dict:
-                sort_trackers_dict[i] = Sort(max_age=5, min_hits=2, iou_threshold=0.2)
+    # Kamera/aşama bazlı gecikme metrikleri
+    metrics = StageMetrics(log_interval=opt.metrics_interval, port=opt.metrics_port)
+    t_loop = time_synchronized()
 
-            current_tracker = sort_trackers_dict[i]
-
-            if webcam:
-                p, s, im0, frame = path[i], '%g: ' % i, im0s[i].copy(), dataset.count
-            else:
-                p, s, im0, frame = path, '', im0s, getattr(dataset, 'frame', 0)
-
-            # Kamera kimliği
-            camera_id = str(p)
-
-            # Kamera rengi
-            if camera_id not in camera_colors:
-                idx = len(camera_colors) % len(preset_colors)
-                camera_colors[camera_id] = preset_colors[idx]
-            box_color = camera_colors[camera_id]
-
-            p = Path(p)
-            save_path = str(save_dir / p.name)
-            txt_path = str(save_dir / 'labels' / p.stem) + (
-                '' if dataset.mode == 'image' else f'_{frame}'
-            )
-
-            current_person_count_raw = 0
-
-            if len(det):
-                det[:, :4] = scale_coords(img.shape[2:], det[:, :4], im0.shape).round()
-
-                # İnsan sayımı
-                person_mask = (det[:, -1] == 0)
-                n_person = int(person_mask.sum())
-                current_person_count_raw = 1 if n_person > 0 else 0
-
-                # Log stringi
-                for c in det[:, -1].unique():
-                    n = (det[:, -1] == c).sum()
-                    if int(c) == 0 and n > 1:
-                        n = 1
-                    s += f"{n} {names[int(c)]}{'s' * (n > 1)}, "
-
-                # SORT güncelleme
-                dets_to_sort = np.empty((0, 6))
-                for *xyxy, conf, detclass in det.cpu().detach().numpy():
-                    dets_to_sort = np.vstack(
-                        (dets_to_sort, np.array([xyxy[0], xyxy[1], xyxy[2], xyxy[3], conf, detclass]))
+    try:
+        for path, img, im0s, vid_cap in dataset:
+            t_pre = time_synchronized()
+
+            # Batch'teki karelerin hangi kameralara ait olduğu (LoadStreams'te hepsi sırayla)
+            frames = im0s if webcam else [im0s]
+            cam_indices = getattr(dataset, 'batch_indices', None) or range(len(frames))
+            camera_ids = [str(p) for p in path] if webcam else [str(path)]
+            metrics.record_many(camera_ids, 'capture_wait', t_pre - t_loop)
+            for camera_id, t_capture in zip(camera_ids, getattr(dataset, 'batch_times', [])):
+                metrics.record(camera_id, 'frame_age', time.time() - t_capture)
+
+            # Statik karelerde modeli atla, önceki tespiti taşı
+            run_idx = list(range(len(frames)))
+            if opt.motion_gate:
+                run_idx = []
+                for j, i in enumerate(cam_indices):
+                    if i not in motion_gates:
+                        motion_gates[i] = MotionGate(force_interval=opt.motion_force_interval)
+                    if motion_gates[i].check(frames[j]):
+                        run_idx.append(j)
+
+            # ROI'li kameraları tam kare batch'inden ayır
+            roi_idx = [j for j in run_idx if cam_indices[j] in seat_rois]
+            run_idx = [j for j in run_idx if cam_indices[j] not in seat_rois]
+
+            pred = [None] * len(frames)  # None: bu karede model çalışmadı
+            in_im0 = [False] * len(frames)  # True: det zaten im0 koordinatlarında
+            t_inf = t_nms = 0.0
+            if run_idx:
+                if webcam and len(run_idx) < len(frames):
+                    img = img[run_idx]
+                out, img, t_i, t_n = infer_batch(model, img, device, half)
+                t_inf += t_i
+                t_nms += t_n
+                for j, det in zip(run_idx, out):
+                    pred[j] = det
+
+            if roi_idx:
+                # Tüm ROI kameralarının masa kırpıntıları tek küçük batch'te
+                crops, owners = [], []
+                for j in roi_idx:
+                    for crop in seat_rois[cam_indices[j]].crops(frames[j], roi_imgsz, stride):
+                        crops.append(crop)
+                        owners.append(j)
+
+                dets = {j: [] for j in roi_idx}
+                if crops:  # tüm koltuklar kare dışındaysa kırpıntı yok
+                    out, roi_img, t_i, t_n = infer_batch(model, np.stack([c[0] for c in crops], 0), device, half,
+                                                         classes=seat_classes)
+                    t_inf += t_i
+                    t_nms += t_n
+                else:
+                    out = []
+                for (_, crop_shape, offset), j, det in zip(crops, owners, out):
+                    if len(det):
+                        dets[j].append(seat_rois[cam_indices[j]].to_frame(det, roi_img.shape[2:], crop_shape, offset))
+                for j in roi_idx:
+                    pred[j] = torch.cat(dets[j]) if dets[j] else torch.zeros((0, 6), device=device)
+                    in_im0[j] = True
+            t3 = time_synchronized()
+
+            # Batch aşamaları: ön işleme tüm kameralar için, inference/NMS sadece modele gidenler için
+            ran = [camera_ids[j] for j in run_idx + roi_idx]
+            metrics.record_many(camera_ids, 'preprocess', t3 - t_pre - t_inf - t_nms)
+            metrics.record_many(ran, 'inference', t_inf)
+            metrics.record_many(ran, 'nms', t_nms)
+
+            for j, det in enumerate(pred):
+                i = cam_indices[j]
+                t_cam = time_synchronized()
+
+                # Her kamera için tracker kontrolü/oluşturma
+                if i not in sort_trackers_dict:
+                    sort_trackers_dict[i] = make_tracker()
+
+                current_tracker = sort_trackers_dict[i]
+
+                if webcam:
+                    # Çizim yapılmayacaksa kare kopyalanmaz
+                    p, im0, frame = path[j], im0s[j].copy() if render else im0s[j], dataset.count
+                else:
+                    p, im0, frame = path, im0s, getattr(dataset, 'frame', 0)
+                s = '' if headless or not webcam else '%g: ' % i
+
+                # Kamera kimliği
+                camera_id = str(p)
+
+                if render:
+                    # Kamera rengi
+                    if camera_id not in camera_colors:
+                        idx = len(camera_colors) % len(preset_colors)
+                        camera_colors[camera_id] = preset_colors[idx]
+                    box_color = camera_colors[camera_id]
+
+                    p = Path(p)
+                    save_path = str(save_dir / p.name)
+                    txt_path = str(save_dir / 'labels' / p.stem) + (
+                        '' if dataset.mode == 'image' else f'_{frame}'
                     )
 
-                tracked_dets = current_tracker.update(dets_to_sort)
+                current_person_count_raw = 0
 
-                if len(tracked_dets) > 0:
+                # Model atlandıysa önceki tespiti (zaten im0 koordinatlarında) kullan
+                ran_model = det is not None
+                if det is None:
+                    det = last_det.get(i, torch.zeros((0, 6)))
+                    in_im0[j] = True
+
+                if len(det):
+                    if not in_im0[j]:
+                        det[:, :4] = scale_coords(img.shape[2:], det[:, :4], im0.shape).round()
+
+                    # İnsan sayımı
+                    person_mask = (det[:, -1] == 0)
+                    n_person = int(person_mask.sum())
+                    current_person_count_raw = 1 if n_person > 0 else 0
+
+                    # Log stringi
+                    if not headless:
+                        s += class_counts_str(det, names)
+
+                    # SORT güncelleme
+                    dets_to_sort = dets_to_sort_array(det)
+                    tracked_dets = current_tracker.update(dets_to_sort)
+                else:
+                    tracked_dets = current_tracker.update()
+
+                last_det[i] = det
+
+                # Otomatik boyut: takip edilen kişilerin güveni ve kaybolan track'lere göre
+                if ran_model and i in adaptive and i not in seat_rois:
+                    person_confs = det[det[:, 5] == 0, 4].cpu().numpy()
+                    size = adaptive[i].size
+                    if adaptive[i].update(person_confs, tracked_dets, im0.shape):
+                        dataset.set_img_size(i, adaptive[i].size)
+                        print(f'[Kamera={camera_id}] Inference boyutu: {size} -> {adaptive[i].size}')
+                t_track = time_synchronized()
+                metrics.record(camera_id, 'tracking', t_track - t_cam)
+
+                if render and len(tracked_dets) > 0:
                     bbox_xyxy = tracked_dets[:, :4]
                     identities = tracked_dets[:, 8]
                     categories = tracked_dets[:, 4]
@@ -326,107 +644,121 @@ def detect(save_img=False):
                         txt_path,
                         box_color=box_color
                     )
-            else:
-                tracked_dets = current_tracker.update()
-
-            # ===== 0/1 OCCUPANCY + 10 SANİYE COUNTDOWN MANTIĞI =====
-            now_ts = time.time()
-            prev_occ = occupancy_state.get(camera_id, 0)
-            last_seen = last_seen_time.get(camera_id, None)
-
-            countdown_active = False
-            countdown_remain = 0.0
-
-            if current_person_count_raw > 0:
-                occupancy_state[camera_id] = 1
-                last_seen_time[camera_id] = now_ts
-            else:
-                if prev_occ == 1:
-                    if last_seen is None:
-                        last_seen_time[camera_id] = now_ts
+                t_overlay = time_synchronized() - t_track
+
+                # Koltuk durumları (ROI tanımlı kameralarda): sadece geçişler kaydedilir
+                if i in seat_engines:
+                    for seat, state, prev_state, dwell in seat_engines[i].update(tracked_dets, im0.shape):
+                        print(f'[Kamera={camera_id}] Koltuk {seat}: {prev_state} -> {state} ({dwell:.0f}s)')
+                        db_writer.submit_event(camera_id, seat, state, prev_state, dwell)
+
+                # Çoklu kamera: ham sayım yerine bu kameraya düşen tekil kişiler (bir önceki tick'in eşleştirmesi)
+                if associator is not None and i in homographies:
+                    associator.observe(i, tracked_dets, time.time())
+                    current_person_count_raw = 1 if associator.owned.get(i, current_person_count_raw) > 0 else 0
+
+                # ===== 0/1 OCCUPANCY + 10 SANİYE COUNTDOWN MANTIĞI =====
+                if camera_id not in occupancy:
+                    occupancy[camera_id] = CameraOccupancy()
+                current_person_count, countdown_active, countdown_remain = \
+                    occupancy[camera_id].update(current_person_count_raw, time.time())
+
+                # Countdown Overlay
+                t_ov = time_synchronized()
+                if render and countdown_active:
+                    draw_countdown(im0, countdown_remain, countdown_tint(tint_cache, im0.shape))
+                t_overlay += time_synchronized() - t_ov
+
+                # --- MYSQL KAYIT ---
+                t_db = time_synchronized()
+                previous_count = last_person_count.get(camera_id, -1)
+                if current_person_count != previous_count:
+                    print(
+                        f'[Kamera={camera_id}] {s}Done. '
+                        f'RawCount={current_person_count_raw}, Occupancy={current_person_count} '
+                        f'({(1E3 * t_inf):.1f}ms) Inference'
+                        + (f', Skip={motion_gates[i].skip_rate:.0%}' if i in motion_gates else '')
+                        + (f', Dropped={dataset.readers[i].dropped}' if hasattr(dataset, 'readers') else '')
+                    )
+                    db_writer.submit(current_person_count, camera_id)
+                    last_person_count[camera_id] = current_person_count
+                t_ov = time_synchronized()
+                metrics.record(camera_id, 'db_enqueue', t_ov - t_db)
+
+                # --- GÖRÜNTÜLEME (Cinsiyet Overlay Yok) ---
+                if view_img:
+                    cv2.imshow(str(p), im0)
+                    key = cv2.waitKey(1) & 0xFF
+                    if key == ord('q'):
+                        cv2.destroyAllWindows()
+                        raise StopIteration
+                t_vid = time_synchronized()
+                metrics.record(camera_id, 'overlay', t_overlay + t_vid - t_ov)
+
+                if save_img:
+                    if dataset.mode == 'image':
+                        if img_writer is None:
+                            img_writer = AsyncImageWriter(queue_size=opt.save_queue, drop_if_full=not opt.save_block)
+                        img_writer.write(save_path, im0)
                     else:
-                        elapsed = now_ts - last_seen
-                        if elapsed < OCCUPANCY_TIMEOUT:
-                            countdown_active = True
-                            countdown_remain = OCCUPANCY_TIMEOUT - elapsed
-                        else:
-                            occupancy_state[camera_id] = 0
-
-            current_person_count = occupancy_state.get(camera_id, 0)
-
-            # Countdown Overlay
-            if countdown_active:
-                h, w = im0.shape[:2]
-                overlay = im0.copy()
-                cv2.rectangle(overlay, (0, 0), (w, h), (0, 0, 255), -1)
-                alpha = 0.35
-                im0[:] = cv2.addWeighted(overlay, alpha, im0, 1 - alpha, 0)
-
-                sec_left = int(countdown_remain) + 1
-                text = f"LEAVING IN {sec_left}s"
-                (tw, th), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 1.2, 2)
-                cx, cy = w // 2, h // 2
-                cv2.putText(
-                    im0,
-                    text,
-                    (cx - tw // 2, cy),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    1.2,
-                    (255, 255, 255),
-                    2,
-                    cv2.LINE_AA
-                )
-
-            # --- MYSQL KAYIT ---
-            previous_count = last_person_count.get(camera_id, -1)
-            if current_person_count != previous_count:
-                print(
-                    f'[Kamera={camera_id}] {s}Done. '
-                    f'RawCount={current_person_count_raw}, Occupancy={current_person_count} '
-                    f'({(1E3 * (t2 - t1)):.1f}ms) Inference'
-                )
-                save_to_mysql(current_person_count, camera_id)
-                last_person_count[camera_id] = current_person_count
-
-            # --- GÖRÜNTÜLEME (Cinsiyet Overlay Yok) ---
-            if view_img:
-                cv2.imshow(str(p), im0)
-                key = cv2.waitKey(1) & 0xFF
-                if key == ord('q'):
-                    cv2.destroyAllWindows()
-                    raise StopIteration
-
-            if save_img:
-                if dataset.mode == 'image':
-                    cv2.imwrite(save_path, im0)
-                else:
-                    if vid_path != save_path:
-                        vid_path = save_path
-                        if isinstance(vid_writer, cv2.VideoWriter):
-                            vid_writer.release()
-                        if vid_cap:
-                            fps = vid_cap.get(cv2.CAP_PROP_FPS)
-                            w = int(vid_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                            h = int(vid_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                        else:
-                            fps, w, h = 30, im0.shape[1], im0.shape[0]
-                            save_path += '.mp4'
-                        vid_writer = cv2.VideoWriter(
-                            save_path,
-                            cv2.VideoWriter_fourcc(*'mp4v'),
-                            fps,
-                            (w, h)
-                        )
-                    vid_writer.write(im0)
-
+                        if save_path not in vid_writers:
+                            if not webcam:
+                                # Yeni video dosyasına geçildi, öncekini kapat
+                                for writer in vid_writers.values():
+                                    writer.close()
+                                vid_writers.clear()
+                            if vid_cap:
+                                fps = vid_cap.get(cv2.CAP_PROP_FPS)
+                                w = int(vid_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+                                h = int(vid_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                            else:
+                                fps, w, h = 30, im0.shape[1], im0.shape[0]
+                            vid_writers[save_path] = AsyncVideoWriter(
+                                save_path if vid_cap else save_path + '.mp4',
+                                fps,
+                                (w, h),
+                                every=opt.save_every,
+                                scale=opt.save_scale,
+                                queue_size=opt.save_queue,
+                                drop_if_full=not opt.save_block
+                            )
+                        vid_writers[save_path].write(im0)
+                    metrics.record(camera_id, 'video_write', time_synchronized() - t_vid)
+
+            # Kameralar arası eşleştirme tick başına bir kez, batch'teki tüm gözlemlerle
+            if associator is not None:
+                associator.resolve(time.time())
+                if associator.unique != last_unique:
+                    print(f'Çoklu kamera: {associator.unique} tekil kişi {associator.owned}')
+                    last_unique = associator.unique
+
+            metrics.maybe_log()
+            t_loop = time_synchronized()
+
+    finally:
+        # 'q', Ctrl-C ya da hata: kuyruktaki kayıtlar yine de yazılır, videolar düzgün kapanır
+        for writer in vid_writers.values():
+            writer.close()
+        if img_writer is not None:
+            img_writer.close()
+        db_writer.close()
+        metrics.close()
+
+    for i, gate in motion_gates.items():
+        print(f'[Kamera={i}] Hareket kontrolü: {gate.skipped}/{gate.frames} kare atlandı ({gate.skip_rate:.1%})')
+    for i, n in getattr(dataset, 'dropped', {}).items():
+        print(f'[Kamera={i}] Yakalama: {n} bayat kare atlandı')
+    summary = metrics.summary()
+    print(json.dumps({'stage_latency_ms': summary}))
     print(f'Done. ({time.time() - t0:.3f}s)')
+    return summary
 
 
 # =========================
 #   MAIN
 # =========================
 
-if __name__ == '__main__':
+def parse_opt(args=None):
     parser = argparse.ArgumentParser()
     parser.add_argument('--weights', nargs='+', type=str, default='yolov7.pt', help='model.pt path(s)')
     parser.add_argument('--source', type=str, default='streams.txt', help='source')
@@ -445,20 +777,88 @@ if __name__ == '__main__':
     parser.add_argument('--project', default='runs/detect', help='save results to project/name')
     parser.add_argument('--name', default='exp', help='save results to project/name')
     parser.add_argument('--exist-ok', action='store_true', help='existing project/name ok, do not increment')
+    parser.add_argument('--headless', action='store_true',
+                        help='production mode: no drawing, log string formatting, imshow or saving')
     parser.add_argument('--no-trace', action='store_true', help='don`t trace model')
+    parser.add_argument('--trace-cache', type=str, default='runs/trace_cache', help='traced model cache directory')
+    parser.add_argument('--save-every', type=int, default=1, help='write every Nth annotated frame to the output video')
+    parser.add_argument('--save-scale', type=float, default=1.0, help='downscale factor for the output video')
+    parser.add_argument('--save-queue', type=int, default=32, help='max frames waiting for the background encoder')
+    parser.add_argument('--save-block', action='store_true',
+                        help='wait for the encoder when its queue is full instead of dropping frames')
+    parser.add_argument('--tracker', type=str, default='sort', choices=['sort', 'vsort'],
+                        help='per-camera tracker (vsort: vectorized SORT with identical track IDs)')
     parser.add_argument('--colored-trk', action='store_true', help='assign different color to every tracking id')
     parser.add_argument('--save-bbox-dim', action='store_true', help='save bounding box dimensions')
     parser.add_argument('--save-with-object-id', action='store_true', help='save results with object id')
     parser.add_argument('--db-path', type=str, default='occ.db', help='(Kullanılmıyor)')
     parser.add_argument('--run-name', type=str, default='person_count', help='Tag')
+    parser.add_argument('--batch-deadline', type=float, default=0,
+                        help='batch ready camera frames within this many ms; > 0 (or --latest-frame, '
+                             '--camera-img-size, --auto-img-size) switches to the latest-frame batcher, where 0 '
+                             'means no wait. Without those the default loader waits for all streams')
+    parser.add_argument('--latest-frame', action='store_true',
+                        help='always run on the newest decoded frame per camera, dropping stale ones')
+    parser.add_argument('--camera-img-size', nargs='+', default=[],
+                        help='per-camera inference size as index=size, e.g. 0=320 2=960')
+    parser.add_argument('--auto-img-size', action='store_true',
+                        help='lower per-camera inference size while tracked persons stay confident, raise it on lost tracks')
+    parser.add_argument('--img-size-levels', nargs='+', type=int, default=[320, 480, 640],
+                        help='inference sizes the auto mode moves between')
+    parser.add_argument('--motion-gate', action='store_true', help='skip inference on static frames')
+    parser.add_argument('--motion-force-interval', type=float, default=5.0,
+                        help='run inference at least once every this many seconds per camera')
+    parser.add_argument('--seat-rois', type=str, default='',
+                        help='per-camera seat polygons JSON (default: seat_rois.json next to streams.txt)')
+    parser.add_argument('--belongings-classes', nargs='+', type=int, default=list(BELONGING_CLASSES),
+                        help='classes that hold a seat without a person (default: backpack, handbag, suitcase, '
+                             'laptop, cell phone, book)')
+    parser.add_argument('--seat-person-grace', type=float, default=3.0,
+                        help='seconds a seat stays occupied after its person disappears')
+    parser.add_argument('--seat-hold-timeout', type=float, default=900.0,
+                        help='seconds a seat held by belongings alone stays held before it becomes abandoned')
+    parser.add_argument('--seat-free-timeout', type=float, default=10.0,
+                        help='seconds with neither person nor belongings before a seat is free')
+    parser.add_argument('--homographies', type=str, default='',
+                        help='per-camera image-to-floor-plane homographies JSON; dedupes people seen by overlapping cameras')
+    parser.add_argument('--multicam-radius', type=float, default=0.6,
+                        help='floor-plane distance (homography units, e.g. metres) under which two views are one person')
+    parser.add_argument('--roi-img-size', type=int, default=320, help='inference size (pixels) for seat crops')
+    parser.add_argument('--db-batch-size', type=int, default=100, help='flush occupancy rows to MySQL at this many rows')
+    parser.add_argument('--db-flush-interval', type=float, default=1.0, help='flush occupancy rows every this many seconds')
+    parser.add_argument('--db-spool', type=str, default='occupancy_spool.jsonl', help='local spool file while MySQL is down')
+    parser.add_argument('--metrics-interval', type=float, default=30.0, help='log stage latency JSON every N seconds (0: off)')
+    parser.add_argument('--backend', type=str, default='torch', choices=['torch', 'onnxruntime'],
+                        help='inference backend (onnxruntime: cached End2End ONNX graph on CPU)')
+    parser.add_argument('--onnx-cache', type=str, default='runs/onnx_cache', help='exported ONNX model cache directory')
+    parser.add_argument('--ort-threads', type=int, default=0, help='onnxruntime intra-op threads (0: all cores)')
+    parser.add_argument('--int8', action='store_true', help='run the INT8 graph produced by quantize.py (implies onnxruntime)')
+    parser.add_argument('--metrics-port', type=int, default=0, help='serve Prometheus text metrics on 127.0.0.1:port')
+    parser.add_argument('--multiprocess', action='store_true',
+                        help='one capture and one tracker process per stream, central inference process')
+    parser.add_argument('--ring-slots', type=int, default=4, help='shared-memory frame ring slots per camera')
+    parser.add_argument('--result-queue', type=int, default=4, help='max pending detections per tracker process')
 
     parser.set_defaults(download=True)
-    opt = parser.parse_args()
+    opt = parser.parse_args(args)
+    try:
+        parse_camera_sizes(opt.camera_img_size)  # biçim hatası açılışta; indeksler detect()'te yayın sayısıyla
+    except ValueError as e:
+        parser.error(str(e))
+    return opt
+
+
+if __name__ == '__main__':
+    opt = parse_opt()
     print(opt)
 
     if opt.download and not os.path.exists(''.join(opt.weights)):
         print('Model weights not found. Attempting to download now...')
         download('./')
 
-    with torch.no_grad():
-        detect()
\ No newline at end of file
+    if opt.multiprocess:
+        from mp_pipeline import run_multiprocess
+        run_multiprocess(opt)
+    else:
+        with torch.no_grad():
+            detect()
\ No newline at end of file
@@ -0,0 +1,26 @@
+import numpy as np
+
+
+# =========================
+#   TESPİT DÖNÜŞÜMLERİ
+# =========================
+
+def dets_to_sort_array(det):
+    """NMS çıktısını (n, 6) [x1, y1, x2, y2, conf, cls] SORT girdisine tek kopyayla çevirir."""
+    if not len(det):
+        return np.empty((0, 6))
+    # float64: eski np.vstack döngüsüyle aynı dtype, SORT sonuçları birebir aynı kalır
+    return det[:, :6].detach().cpu().numpy().astype(np.float64)
+
+
+def class_counts_str(det, names):
+    """Sınıf bazlı sayım log stringi, örn: '1 person, 2 books, '. İnsan sayısı 1'e sabitlenir."""
+    if not len(det):
+        return ''
+    classes, counts = det[:, -1].unique(return_counts=True)
+    s = ''
+    for c, n in zip(classes.int().tolist(), counts.tolist()):
+        if c == 0 and n > 1:
+            n = 1
+        s += f"{n} {names[c]}{'s' * (n > 1)}, "
+    return s
@@ -0,0 +1,180 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+try:
+    import onnxruntime as ort
+    HAS_ORT = True
+except ImportError:
+    HAS_ORT = False
+
+
+# =========================
+#   YARDIMCILAR
+# =========================
+
+def weights_hash(weights, n=16):
+    """Ağırlık dosya(lar)ının sha256 özeti, önbellek anahtarı olarak kullanılır."""
+    h = hashlib.sha256()
+    for w in weights if isinstance(weights, (list, tuple)) else [weights]:
+        with open(w, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    return h.hexdigest()[:n]
+
+
+def export_end2end_onnx(weights, img_size, f, conf_thres=0.25, iou_thres=0.45, max_obj=300, max_wh=4096):
+    """attempt_load modelini ORT NMS'li End2End grafiği olarak ONNX'e çevirir (yolov7 export.py ile aynı adımlar)."""
+    import onnx
+    import models.common
+    from models.experimental import attempt_load, End2End
+    from utils.activations import Hardswish, SiLU
+    from utils.general import check_img_size
+
+    model = attempt_load(weights, map_location=torch.device('cpu'))
+    names = model.module.names if hasattr(model, 'module') else model.names
+    stride = int(model.stride.max())
+    img_size = check_img_size(img_size, s=stride)
+
+    # Export uyumluluğu
+    for k, m in model.named_modules():
+        m._non_persistent_buffers_set = set()
+        if isinstance(m, models.common.Conv):
+            if isinstance(m.act, nn.Hardswish):
+                m.act = Hardswish()
+            elif isinstance(m.act, nn.SiLU):
+                m.act = SiLU()
+    model.model[-1].export = False  # End2End grid'li (decode edilmiş) çıktı ister
+
+    model = End2End(model, max_obj, iou_thres, conf_thres, max_wh, torch.device('cpu'))
+    model.eval()
+
+    img = torch.zeros(1, 3, img_size, img_size)
+    Path(f).parent.mkdir(parents=True, exist_ok=True)
+    torch.onnx.export(model, img, f, verbose=False, opset_version=12,
+                      input_names=['images'], output_names=['output'],
+                      dynamic_axes={'images': {0: 'batch'}, 'output': {0: 'num_dets'}})
+
+    # Çalışma anında PyTorch modeline gerek kalmasın diye sınıf isimleri ve stride grafiğe yazılır
+    onnx_model = onnx.load(f)
+    for key, value in (('names', json.dumps(list(names))), ('stride', str(stride)), ('img_size', str(img_size))):
+        meta = onnx_model.metadata_props.add()
+        meta.key, meta.value = key, value
+    onnx.save(onnx_model, f)
+    print(f'ONNX export: {f} ({img_size}px, conf={conf_thres}, iou={iou_thres})')
+    return f
+
+
+# =========================
+#   ONNX RUNTIME BACKEND
+# =========================
+
+class OnnxRuntimeBackend:
+    """NMS'i grafiğin içinde olan End2End ONNX modelini CPU'da ONNX Runtime ile çalıştırır.
+
+    Grafik ağırlık özeti, img size ve NMS eşiklerine göre `cache_dir` altında bir kez
+    export edilir, sonraki açılışlarda doğrudan yüklenir. yolov7 grafiği sabit giriş
+    boyutuyla export edildiği için her kare boyutu (kare kenarı) ayrı bir oturumdur.
+    Girdi numpy uint8 batch'tir, çıktı non_max_suppression ile aynı biçimdedir: her kare
+    için (n, 6) [x1, y1, x2, y2, conf, cls] tensörü.
+    """
+
+    def __init__(self, weights, img_size=640, conf_thres=0.25, iou_thres=0.45, max_obj=300,
+                 cache_dir='runs/onnx_cache', threads=0, onnx_path=None, int8=False):
+        assert HAS_ORT, 'onnxruntime bulunamadı: pip install onnxruntime'
+        self.weights = weights
+        self.int8 = int8  # quantize.py ile üretilmiş INT8 grafiği kullan
+        self.conf_thres = conf_thres
+        self.iou_thres = iou_thres
+        self.max_obj = max_obj
+        self.cache_dir = Path(cache_dir)
+        self.threads = threads
+        self._key = None
+        self.sessions = {}  # {kare kenarı: InferenceSession}
+
+        session = self._load(onnx_path) if onnx_path else self._session(img_size)
+        meta = session.get_modelmeta().custom_metadata_map
+        self.names = json.loads(meta['names'])
+        self.stride = np.array([int(meta['stride'])])
+        self.img_size = int(meta['img_size'])
+        if onnx_path:
+            self.sessions[self.img_size] = session
+
+    def _load(self, onnx_path):
+        so = ort.SessionOptions()
+        so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        so.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        so.intra_op_num_threads = self.threads or os.cpu_count() or 1
+        so.inter_op_num_threads = 1
+        so.enable_cpu_mem_arena = True
+        return ort.InferenceSession(str(onnx_path), so, providers=['CPUExecutionProvider'])
+
+    def onnx_path(self, size, int8=False):
+        """Önbellekteki fp32 (ya da INT8) grafiğin yolu."""
+        if self._key is None:
+            self._key = weights_hash(self.weights)
+        w = self.weights[0] if isinstance(self.weights, (list, tuple)) else self.weights
+        return self.cache_dir / (f'{Path(w).stem}_{self._key}_{size}'
+                                 f'_c{self.conf_thres}_i{self.iou_thres}_m{self.max_obj}{"_int8" if int8 else ""}.onnx')
+
+    def _session(self, size):
+        if size not in self.sessions:
+            onnx_path = self.onnx_path(size, self.int8)
+            if self.int8:
+                assert onnx_path.exists(), \
+                    f'{onnx_path} bulunamadı, önce: python quantize.py --weights ... --img-size {size}'
+                print(f'INT8 ONNX yüklendi: {onnx_path}')
+            elif not onnx_path.exists():
+                export_end2end_onnx(self.weights, size, str(onnx_path), self.conf_thres, self.iou_thres, self.max_obj)
+            else:
+                print(f'ONNX önbellekten yüklendi: {onnx_path}')
+            self.sessions[size] = self._load(onnx_path)
+        return self.sessions[size]
+
+    def prepare(self, sizes):
+        """Kullanılacak tüm kare boyutlarının oturumlarını açılışta hazırlar.
+
+        fp32'de eksik grafikler şimdi export edilir, döngü içinde export beklenmez.
+        INT8'de quantize edilmemiş boyut varsa hepsi tek mesajla bildirilip durulur.
+        """
+        sizes = sorted(set(sizes))
+        if self.int8:
+            missing = [size for size in sizes if size not in self.sessions and not self.onnx_path(size, True).exists()]
+            assert not missing, \
+                'INT8 grafiği olmayan boyutlar: ' + ', '.join(map(str, missing)) + '. Her biri için önce: ' + \
+                ' ; '.join(f'python quantize.py --weights ... --img-size {size}' for size in missing)
+        for size in sizes:
+            self._session(size)
+
+    @staticmethod
+    def preprocess(img):
+        """uint8 (n, 3, h, w) -> float32 [0, 1] (n, 3, s, s)
+
+        Dikdörtgen letterbox çıktısı ortalanarak kareye tamamlanır; scale_coords aynı
+        oran ve ortalanmış pad'i hesapladığı için kutular doğru yere döner.
+        """
+        img = img[None] if img.ndim == 3 else img
+        h, w = img.shape[2:]
+        if h != w:
+            size = max(h, w)
+            dh, dw = size - h, size - w
+            img = np.pad(img, ((0, 0), (0, 0), (dh // 2, dh - dh // 2), (dw // 2, dw - dw // 2)),
+                         constant_values=114)
+        return img.astype(np.float32) / 255.0
+
+    def __call__(self, img, classes=None):
+        session = self._session(img.shape[2])
+        out = session.run(None, {session.get_inputs()[0].name: img})[0]  # (num_dets, 7): [batch, x1, y1, x2, y2, cls, conf]
+        if classes:
+            out = out[np.isin(out[:, 5], classes)]
+
+        pred = []
+        for b in range(img.shape[0]):
+            rows = out[out[:, 0] == b]
+            pred.append(torch.from_numpy(rows[:, [1, 2, 3, 4, 6, 5]].copy()))
+        return pred
@@ -0,0 +1,76 @@
+import json
+import time
+import inspect
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+
+from models.experimental import attempt_load
+from utils.torch_utils import TracedModel
+from inference_backends import weights_hash
+
+# meta.pt bir nn.Module içerir; torch>=1.13 weights_only ister (2.6+ varsayılanı True),
+# daha eski sürümler bu argümanı tanımaz
+TORCH_LOAD_KWARGS = {'weights_only': False} if 'weights_only' in inspect.signature(torch.load).parameters else {}
+
+
+class CachedTracedModel(nn.Module):
+    """Diskten yüklenen TracedModel: TorchScript gövde + Detect katmanı (forward'ı TracedModel ile aynı)."""
+
+    def __init__(self, traced, detect_layer, stride, names):
+        super(CachedTracedModel, self).__init__()
+        self.model = traced
+        self.detect_layer = detect_layer
+        self.stride = stride
+        self.names = names
+
+    def forward(self, x, augment=False, profile=False):
+        out = self.model(x)
+        out = self.detect_layer(out)
+        return out
+
+
+def trace_cache_dir(weights, img_size, cache_dir='runs/trace_cache'):
+    """Önbellek klasörü: ağırlık özeti + img size + torch sürümü."""
+    torch_version = torch.__version__.replace('+', '_')
+    return Path(cache_dir) / f'{weights_hash(weights)}_{img_size}_torch{torch_version}'
+
+
+def load_traced_model(weights, device, img_size, cache_dir='runs/trace_cache'):
+    """Fuse edilmiş ve trace edilmiş modeli önbellekten yükler, yoksa üretip kaydeder.
+
+    Her açılışın süresi önbellek klasöründeki startup.jsonl'a yazılır ve son cold/warm
+    açılış süreleri karşılaştırmalı olarak basılır.
+    """
+    t0 = time.time()
+    d = trace_cache_dir(weights, img_size, cache_dir)
+    traced_path, meta_path = d / 'traced.pt', d / 'meta.pt'
+
+    if traced_path.exists() and meta_path.exists():
+        start = 'warm'
+        traced = torch.jit.load(str(traced_path), map_location=device)
+        meta = torch.load(meta_path, map_location=device, **TORCH_LOAD_KWARGS)
+        model = CachedTracedModel(traced, meta['detect_layer'], meta['stride'], meta['names'])
+    else:
+        start = 'cold'
+        model = attempt_load(weights, map_location=device)  # attempt_load içinde fuse edilir
+        model = TracedModel(model, device, img_size)
+        d.mkdir(parents=True, exist_ok=True)
+        torch.jit.save(model.model, str(traced_path))
+        torch.save({'detect_layer': model.detect_layer, 'stride': model.stride, 'names': model.names}, meta_path)
+    model.eval()
+    dt = time.time() - t0
+
+    # Başlatma raporu
+    log_path = d / 'startup.jsonl'
+    with open(log_path, 'a') as f:
+        f.write(json.dumps({'ts': round(t0, 3), 'start': start, 'seconds': round(dt, 3)}) + '\n')
+    last = {}
+    with open(log_path) as f:
+        for line in f:
+            rec = json.loads(line)
+            last[rec['start']] = rec['seconds']
+    report = ', '.join(f'{k}={v:.2f}s' for k, v in sorted(last.items()))
+    print(f'Model başlatma: {start} start {dt:.2f}s (son açılışlar: {report}) [{d}]')
+    return model
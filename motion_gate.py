@@ -0,0 +1,59 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Kamera bazlı ucuz hareket ön kontrolü.
+
+    Kare küçültülüp griye çevrilir ve en son modele giden kareyle farkı alınır.
+    Değişen piksel oranı eşiğin altındaysa kare statik sayılır ve model atlanır.
+    Güvenlik için `force_interval` saniyede bir model her durumda çalıştırılır.
+    """
+
+    def __init__(self, size=64, pixel_thres=25, area_thres=0.005, force_interval=5.0):
+        self.size = size  # küçültülmüş karenin genişliği (piksel)
+        self.pixel_thres = pixel_thres  # piksel başına gri seviye farkı eşiği
+        self.area_thres = area_thres  # değişmiş sayılması için gereken piksel oranı
+        self.force_interval = force_interval
+
+        self.reference = None  # en son modele giden karenin küçük hali
+        self.last_run_ts = 0.0
+
+        # Sayaçlar
+        self.frames = 0
+        self.skipped = 0
+
+    def _small(self, im0):
+        h, w = im0.shape[:2]
+        small = cv2.resize(im0, (self.size, max(1, int(self.size * h / w))), interpolation=cv2.INTER_AREA)
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (3, 3), 0)
+
+    def check(self, im0):
+        """Kare modele gitmeli mi? True: çalıştır, False: önceki sonucu kullan."""
+        self.frames += 1
+        now_ts = time.time()
+        small = self._small(im0)
+
+        run = (
+            self.reference is None
+            or self.reference.shape != small.shape
+            or now_ts - self.last_run_ts >= self.force_interval
+        )
+        if not run:
+            diff = cv2.absdiff(small, self.reference)
+            changed = np.count_nonzero(diff > self.pixel_thres) / diff.size
+            run = bool(changed >= self.area_thres)
+
+        if run:
+            self.reference = small
+            self.last_run_ts = now_ts
+        else:
+            self.skipped += 1
+        return run
+
+    @property
+    def skip_rate(self):
+        return self.skipped / self.frames if self.frames else 0.0
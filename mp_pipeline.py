@@ -0,0 +1,378 @@
+import os
+import time
+import queue
+import multiprocessing as mp
+from multiprocessing import shared_memory, resource_tracker
+
+import cv2
+import numpy as np
+
+from utils.datasets import letterbox
+from utils.general import clean_str
+
+
+# =========================
+#   PAYLAŞIMLI BELLEK HALKASI
+# =========================
+
+class FrameRing:
+    """Bir kameranın kareleri için paylaşımlı bellekte `slots` gözlü halka.
+
+    Bellek düzeni: int64 başlık [latest_seq, closed, slot_seq * slots], ardından
+    letterbox'lanmış img gözleri (RGB, CHW) ve orijinal im0 gözleri (BGR, HWC).
+    Yazıcı bir gözü doldururken o gözün sırasını -1 yapar, bitince gerçek sıraya
+    çeker ve en son latest_seq'i günceller. Okuyucu okumadan önce ve sonra gözün
+    sırasını kontrol eder; arada değiştiyse kare yarım yazılmış demektir ve atlanır.
+    Okuma tarafı kopyasız numpy view'ları kullanır.
+    """
+
+    def __init__(self, shm, slots, img_shape, im0_shape):
+        self.shm = shm
+        self.slots = slots
+        self.img_shape = tuple(img_shape)
+        self.im0_shape = tuple(im0_shape)
+
+        n_header = 2 + slots
+        img_size, im0_size = int(np.prod(img_shape)), int(np.prod(im0_shape))
+        self.header = np.ndarray((n_header,), dtype=np.int64, buffer=shm.buf)
+        off = 8 * n_header
+        self.img = np.ndarray((slots, *img_shape), dtype=np.uint8, buffer=shm.buf, offset=off)
+        off += slots * img_size
+        self.im0 = np.ndarray((slots, *im0_shape), dtype=np.uint8, buffer=shm.buf, offset=off)
+
+    @staticmethod
+    def nbytes(slots, img_shape, im0_shape):
+        return 8 * (2 + slots) + slots * (int(np.prod(img_shape)) + int(np.prod(im0_shape)))
+
+    @classmethod
+    def create(cls, slots, img_shape, im0_shape):
+        shm = shared_memory.SharedMemory(create=True, size=cls.nbytes(slots, img_shape, im0_shape))
+        ring = cls(shm, slots, img_shape, im0_shape)
+        ring.header[0] = 0
+        ring.header[1] = 0
+        ring.header[2:] = -1
+        return ring
+
+    @classmethod
+    def attach(cls, spec):
+        return cls(_attach_shm(spec['name']), spec['slots'], spec['img_shape'], spec['im0_shape'])
+
+    def spec(self):
+        """Başka bir süreçte attach() için gerekenler (picklable)."""
+        return {'name': self.shm.name, 'slots': self.slots, 'img_shape': self.img_shape, 'im0_shape': self.im0_shape}
+
+    # --- Yazıcı tarafı ---
+    def slot_for_write(self):
+        seq = int(self.header[0]) + 1
+        slot = seq % self.slots
+        self.header[2 + slot] = -1  # yazılıyor
+        return seq, slot
+
+    def publish(self, seq, slot):
+        self.header[2 + slot] = seq
+        self.header[0] = seq
+
+    def close_stream(self):
+        self.header[1] = 1
+
+    # --- Okuyucu tarafı ---
+    @property
+    def latest(self):
+        return int(self.header[0])
+
+    @property
+    def closed(self):
+        return bool(self.header[1])
+
+    def slot_of(self, seq):
+        """Kare hâlâ halkadaysa gözün indeksini, üzerine yazıldıysa None döndürür."""
+        slot = seq % self.slots
+        return slot if self.header[2 + slot] == seq else None
+
+    def close(self):
+        # View'lar serbest bırakılmadan mmap kapatılamaz
+        self.header = self.img = self.im0 = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def _attach_shm(name):
+    """Var olan segmente bağlanır. Segmenti capture süreci yaratır, silen (unlink) ise ana
+    süreçtir; resource_tracker'ın bağlanan süreç kapanınca segmenti silmemesi için kayıt
+    geri alınır (Python < 3.13)."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+# =========================
+#   WORKER SÜREÇLERİ
+# =========================
+
+def capture_worker(index, source, slots, img_size, stride, info_q, stop):
+    """Tek kamerayı okur, letterbox'lar ve kareleri kendi halkasına yazar."""
+    cap = cv2.VideoCapture(eval(source) if source.isnumeric() else source)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # sürücü tamponunda bayat kare birikmesin
+    ok, im0 = cap.read() if cap.isOpened() else (False, None)
+    if not ok:
+        info_q.put(('ring', index, None))
+        return
+
+    img = letterbox(im0, img_size, auto=True, stride=stride)[0]
+    ring = FrameRing.create(slots, (3, *img.shape[:2]), im0.shape)
+    info_q.put(('ring', index, ring.spec()))
+    fps = cap.get(cv2.CAP_PROP_FPS) % 100 or 30
+    print(f'{index + 1}: {source}... success ({im0.shape[1]}x{im0.shape[0]} at {fps:.0f} FPS, pid={os.getpid()}).')
+
+    h, w = ring.im0_shape[:2]
+    try:
+        while not stop.is_set():
+            seq, slot = ring.slot_for_write()
+            if im0 is None:
+                # Kare doğrudan halkanın gözüne decode edilir
+                ok, im0 = cap.read(ring.im0[slot])
+                if not ok:
+                    break
+            if not np.shares_memory(im0, ring.im0[slot]):
+                # İlk kare ya da çözünürlüğü değişen yayın: halka boyutu korunur
+                ring.im0[slot] = im0 if im0.shape == ring.im0_shape else cv2.resize(im0, (w, h))
+            img = letterbox(ring.im0[slot], img_size, auto=True, stride=stride)[0]
+            ring.img[slot] = img[:, :, ::-1].transpose(2, 0, 1)
+            ring.publish(seq, slot)
+            im0 = None
+    finally:
+        ring.close_stream()
+        cap.release()
+        ring.close()
+
+
+def inference_worker(opt, info_q, spec_q, result_qs, stop):
+    """Tüm halkalardan hazır kareleri toplayıp tek batch'te modelden geçirir,
+    tespitleri im0 koordinatlarında kameraların sonuç kuyruklarına bırakır."""
+    import torch
+    import detect_and_track
+    from utils.general import scale_coords
+
+    detect_and_track.opt = opt  # infer_batch/load_model global opt'u kullanır
+    with torch.no_grad():
+        model, device, half, stride, imgsz = detect_and_track.load_model()
+        names = model.module.names if hasattr(model, 'module') else model.names
+        info_q.put(('model', stride, imgsz, list(names)))
+
+        specs = spec_q.get()  # {kamera: spec}
+        rings = {i: FrameRing.attach(s) for i, s in specs.items()}
+        consumed = {i: 0 for i in rings}
+        dropped = {i: 0 for i in rings}  # inference'a hiç girmeden üzerine yazılan kareler
+        deadline = opt.batch_deadline / 1E3
+
+        def ready():
+            return [i for i, r in rings.items() if r.latest > consumed[i]]
+
+        try:
+            while not stop.is_set():
+                cams = ready()
+                if not cams:
+                    if all(r.closed for r in rings.values()):
+                        break
+                    time.sleep(0.001)
+                    continue
+
+                # İlk hazır kareden sonra diğer kameraları en fazla deadline kadar bekle
+                t_end = time.time() + deadline
+                while len(cams) < len(rings) and time.time() < t_end:
+                    time.sleep(0.001)
+                    cams = ready()
+
+                groups = {}  # {img shape: [(kamera, seq, img)]}
+                for i in cams:
+                    ring = rings[i]
+                    seq = ring.latest
+                    slot = ring.slot_of(seq)
+                    dropped[i] += seq - consumed[i] - 1
+                    consumed[i] = seq
+                    if slot is None:
+                        continue
+                    img = ring.img[slot].copy()
+                    if ring.slot_of(seq) is None:
+                        continue  # okurken üzerine yazıldı
+                    groups.setdefault(img.shape, []).append((i, seq, img))
+
+                for batch in groups.values():
+                    img = np.stack([b[2] for b in batch], 0)
+                    pred, img_in, t_inf, _ = detect_and_track.infer_batch(model, img, device, half)
+                    for (i, seq, _), det in zip(batch, pred):
+                        if len(det):
+                            det[:, :4] = scale_coords(img_in.shape[2:], det[:, :4], rings[i].im0_shape).round()
+                        try:
+                            result_qs[i].put_nowait((seq, det.cpu().numpy(), t_inf))
+                        except queue.Full:
+                            pass  # tracker geride kaldı, bu kare düşer
+        finally:
+            # Bitiş işareti her tracker'a ulaşana kadar denenir (tracker kuyruğu boşaltıyor);
+            # ulaşmazsa tracker result_q.get()'te sonsuza kadar bekler. Çöken bir tracker'ın
+            # dolu kuyruğu diğerlerini bekletmesin diye sırayla ve bloklamadan denenir.
+            pending = list(result_qs)
+            while pending and not stop.is_set():
+                for q in list(pending):
+                    try:
+                        q.put_nowait(None)
+                        pending.remove(q)
+                    except queue.Full:
+                        pass
+                if pending:
+                    time.sleep(0.1)
+            for i, ring in rings.items():
+                print(f'[Kamera={i}] Yakalama: {dropped[i]}/{consumed[i]} bayat kare atlandı')
+                ring.close()
+
+
+def tracker_worker(opt, index, camera_id, names, spec, result_q, db_q):
+    """Kameranın SORT tracker'ı ve 0/1 occupancy durumu. Değişimler ana sürece gönderilir."""
+    import torch
+    import detect_and_track
+    from detect_and_track import CameraOccupancy, draw_boxes, draw_countdown, countdown_tint
+    from detection_utils import dets_to_sort_array, class_counts_str
+
+    detect_and_track.opt = opt
+    tracker = detect_and_track.make_tracker()
+    occupancy = CameraOccupancy()
+    last_count = -1
+    ring = FrameRing.attach(spec) if opt.view_img else None
+    tint_cache = {}
+
+    try:
+        while True:
+            item = result_q.get()
+            if item is None:
+                break
+            seq, det, t_inf = item
+            det = torch.from_numpy(det)
+
+            raw = int((det[:, 5] == 0).any()) if len(det) else 0
+            tracked_dets = tracker.update(dets_to_sort_array(det)) if len(det) else tracker.update()
+            count, countdown_active, countdown_remain = occupancy.update(raw, time.time())
+
+            if count != last_count:
+                s = f'{index}: ' + (class_counts_str(det, names) if len(det) else '')
+                print(f'[Kamera={camera_id}] {s}Done. RawCount={raw}, Occupancy={count} '
+                      f'({(1E3 * t_inf):.1f}ms) Inference, pid={os.getpid()}')
+                db_q.put((count, camera_id))
+                last_count = count
+
+            if ring is not None:
+                slot = ring.slot_of(seq)
+                if slot is None:
+                    continue  # kare halkada ezildi, bu turda gösterim yok
+                im0 = ring.im0[slot].copy()
+                if len(tracked_dets):
+                    draw_boxes(im0, tracked_dets[:, :4], tracked_dets[:, 8], tracked_dets[:, 4], names)
+                if countdown_active:
+                    draw_countdown(im0, countdown_remain, countdown_tint(tint_cache, im0.shape))
+                cv2.imshow(camera_id, im0)
+                cv2.waitKey(1)
+    finally:
+        if ring is not None:
+            ring.close()
+            cv2.destroyAllWindows()
+
+
+# =========================
+#   ANA SÜREÇ
+# =========================
+
+def _wait(q, procs):
+    """Kuyruktan mesaj bekler; mesajı gönderecek süreçler çöktüyse hata verir."""
+    while True:
+        try:
+            return q.get(timeout=1.0)
+        except queue.Empty:
+            assert any(p.is_alive() for p in procs), f'{procs[0].name} süreci beklenmedik şekilde kapandı'
+
+
+def run_multiprocess(opt):
+    """streams.txt'teki her yayın için ayrı yakalama ve tracker süreci, tek bir merkezi
+    inference süreci. Kareler paylaşımlı bellek halkalarıyla kopyasız aktarılır."""
+    from detect_and_track import DB_CONFIG, init_mysql_table
+    from occupancy_writer import OccupancyWriter
+
+    init_mysql_table()
+    db_writer = OccupancyWriter(DB_CONFIG, batch_size=opt.db_batch_size, flush_interval=opt.db_flush_interval,
+                                spool_path=opt.db_spool)
+
+    if os.path.isfile(opt.source):
+        with open(opt.source) as f:
+            sources = [x.strip() for x in f.read().strip().splitlines() if len(x.strip())]
+    else:
+        sources = [opt.source]
+    camera_ids = [clean_str(s) for s in sources]
+    if not opt.classes:
+        opt.classes = [0]
+
+    ctx = mp.get_context('spawn')  # CUDA ve OpenCV fork'la güvenli değil
+    stop = ctx.Event()
+    info_q, spec_q, db_q = ctx.Queue(), ctx.Queue(), ctx.Queue()
+    result_qs = [ctx.Queue(maxsize=opt.result_queue) for _ in sources]
+
+    # 1) Model yüklensin ki stride/img size yakalama süreçlerine verilebilsin
+    infer_p = ctx.Process(target=inference_worker, args=(opt, info_q, spec_q, result_qs, stop),
+                          name='inference', daemon=True)
+    infer_p.start()
+    _, stride, imgsz, names = _wait(info_q, [infer_p])
+
+    # 2) Kamera başına yakalama süreci, her biri kendi halkasını yaratır
+    capture_ps = [ctx.Process(target=capture_worker, args=(i, s, opt.ring_slots, imgsz, stride, info_q, stop),
+                              name=f'capture-{i}', daemon=True) for i, s in enumerate(sources)]
+    for p in capture_ps:
+        p.start()
+    specs = {}
+    for _ in sources:
+        _, i, spec = _wait(info_q, capture_ps)
+        if spec is None:
+            print(f'{i + 1}: {sources[i]}... açılamadı, atlanıyor.')
+        else:
+            specs[i] = spec
+    spec_q.put(specs)
+
+    # 3) Kamera başına tracker/occupancy süreci
+    tracker_ps = [ctx.Process(target=tracker_worker,
+                              args=(opt, i, camera_ids[i], names, specs[i], result_qs[i], db_q),
+                              name=f'tracker-{i}', daemon=True) for i in specs]
+    for p in tracker_ps:
+        p.start()
+
+    t0 = time.time()
+    try:
+        while any(p.is_alive() for p in tracker_ps):
+            try:
+                count, camera_id = db_q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            db_writer.submit(count, camera_id)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for p in [*capture_ps, infer_p, *tracker_ps]:
+            p.join(timeout=5.0)
+            if p.is_alive():
+                p.terminate()
+        while True:
+            try:
+                db_writer.submit(*db_q.get_nowait())
+            except queue.Empty:
+                break
+        db_writer.close()
+        # Halkaları capture süreçleri yaratır ama sahibi ana süreç: tüm worker'lar kapandıktan sonra silinir
+        for spec in specs.values():
+            try:
+                shm = shared_memory.SharedMemory(name=spec['name'])
+                shm.close()
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+    print(f'Done. ({time.time() - t0:.3f}s)')
@@ -0,0 +1,98 @@
+import json
+from pathlib import Path
+
+import cv2
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+
+# =========================
+#   HOMOGRAFİ AYARLARI
+# =========================
+
+def load_homographies(path, sources):
+    """Kamera görüntüsünden zemin planına (metre) 3x3 homografileri okur.
+
+    JSON anahtarı kamera indeksi ("0") ya da streams.txt'deki kaynak olabilir:
+        {"0": [[h11, h12, h13], [h21, h22, h23], [h31, h32, h33]], "http://...": [...]}
+    Dönen değer: {kamera_index: (3, 3) float64}
+    """
+    if not path or not Path(path).is_file():
+        return {}
+
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    homographies = {}
+    for i, src in enumerate(sources):
+        H = config.get(str(i), config.get(str(src)))
+        if H is not None:
+            homographies[i] = np.asarray(H, dtype=np.float64).reshape(3, 3)
+    print(f"Çoklu kamera: {path} dosyasından {len(homographies)} kamera için homografi yüklendi.")
+    return homographies
+
+
+# =========================
+#   KAMERALAR ARASI EŞLEŞTİRME
+# =========================
+
+class MultiCamAssociator:
+    """Örtüşen kameralarda aynı kişinin iki kez sayılmasını önler.
+
+    Her kameranın takip edilen kişilerinin ayak noktası (kutu alt ortası) homografiyle
+    zemin planına taşınır. Tick başına bir kez tüm kameraların noktaları birlikte
+    eşleştirilir: farklı kameralardan `radius` metreden yakın noktalar aynı kişidir.
+    Bir bileşende aynı kameradan birden fazla nokta varsa bunlar ayrı kişilerdir, yani
+    bileşenin kişi sayısı en çok nokta veren kameranın sayısıdır. Kişi o kameraya
+    sayılır (eşitlikte küçük indeks), diğer kameralar onu kendi sayımına katmaz.
+    """
+
+    def __init__(self, homographies, radius=0.6, max_age=1.0):
+        self.homographies = homographies
+        self.radius = radius
+        self.max_age = max_age  # bu kadar saniyedir güncellenmeyen kameranın noktaları yok sayılır
+        self._obs = {}  # {kamera_index: (zaman, (n, 2) zemin noktaları)}
+        self.owned = {}  # {kamera_index: sahip olunan tekil kişi sayısı}
+        self.unique = 0  # tüm homografili kameralardaki tekil kişi sayısı
+
+    def observe(self, index, tracked_dets, now_ts):
+        """Kameranın son SORT çıktısındaki kişileri zemin planına taşır."""
+        if index not in self.homographies:
+            return
+        persons = tracked_dets[tracked_dets[:, 4] == 0] if len(tracked_dets) else np.empty((0, 9))
+        foot = np.stack(((persons[:, 0] + persons[:, 2]) / 2, persons[:, 3]), 1).astype(np.float64)
+        if len(foot):
+            foot = cv2.perspectiveTransform(foot[:, None], self.homographies[index])[:, 0]
+        self._obs[index] = (now_ts, foot)
+
+    def resolve(self, now_ts):
+        """Tüm kameraların son gözlemlerini tek seferde eşleştirir, `owned`'ı günceller."""
+        cams, pts = [], []
+        for index, (t, foot) in self._obs.items():
+            if now_ts - t <= self.max_age and len(foot):
+                cams.append(np.full(len(foot), index))
+                pts.append(foot)
+        if not pts:
+            self.owned = {index: 0 for index in self._obs}
+            self.unique = 0
+            return self.owned
+
+        cams, pts = np.concatenate(cams), np.concatenate(pts)
+        d = np.linalg.norm(pts[:, None] - pts[None], axis=2)
+        a, b = np.nonzero((d < self.radius) & (cams[:, None] != cams[None]))
+        n = len(pts)
+        n_comp, comp = connected_components(coo_matrix((np.ones(len(a)), (a, b)), shape=(n, n)), directed=False)
+
+        # Bileşen x kamera nokta sayısı tablosu
+        cam_ids = np.unique(cams)
+        table = np.zeros((n_comp, len(cam_ids)), dtype=np.int64)
+        np.add.at(table, (comp, np.searchsorted(cam_ids, cams)), 1)
+        owner = table.argmax(1)  # eşitlikte ilk (küçük indeksli) kamera
+        persons = table.max(1)
+
+        self.owned = {index: 0 for index in self._obs}
+        for k, index in enumerate(cam_ids):
+            self.owned[int(index)] = int(persons[owner == k].sum())
+        self.unique = int(persons.sum())
+        return self.owned
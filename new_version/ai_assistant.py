@@ -6,6 +6,7 @@ from openai import OpenAI
 import mysql.connector
 import re
 import time
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import mplcursors
@@ -172,7 +173,8 @@ class LibraryChatbot:
             # PLAN A: Gelişmiş Modelleri (ForecastingEngine) Dene
             try:
                 best_model, pred, err, low, high, all_res = self.forecaster.run_best_slot_forecast(
-                    self.data_manager.hourly_data, target_day, target_hour, exam_mode=0
+                    self.data_manager.hourly_data, target_day, target_hour, exam_mode=0,
+                    slot_index=self.data_manager.slot_index
                 )
                 return (f"Forecast for {day_name} at {target_hour}:00 is approx {pred:.0f} people. "
                         f"(Model: {best_model}, Range: {low:.0f}-{high:.0f})")
@@ -195,11 +197,11 @@ class LibraryChatbot:
             # PLAN C: (SON ÇARE) Basit Tarihsel Ortalama
             # Eğer karmaşık modeller ve Prophet çalışmazsa, elimizdeki ham verinin ortalamasını al.
             try:
-                df = self.data_manager.hourly_data
-                # İlgili gün ve saatteki tüm geçmiş verileri filtrele
-                filtered = df[(df['weekday'] == target_day) & (df['hour'] == target_hour)]
-                if not filtered.empty:
-                    avg_val = filtered['saatlik_ortalama_doluluk'].mean()
+                slots = self.data_manager.slot_index
+                # İlgili gün ve saatteki tüm geçmiş veriler (her iki dönem)
+                filtered = np.concatenate([slots.get((mode, target_day, target_hour), np.empty(0)) for mode in (0, 1)])
+                if len(filtered):
+                    avg_val = filtered.mean()
                     return f"Complex models insufficient, but historical average for {day_name} {target_hour}:00 is ~{avg_val:.0f} people."
             except:
                 pass
@@ -221,15 +223,9 @@ class LibraryChatbot:
 
     def _get_live_occupancy_total(self):
         if not self.db_config: return 0
-        try:
-            conn = mysql.connector.connect(**self.db_config)
-            cursor = conn.cursor()
-            query = "SELECT person_count FROM person_logs WHERE id IN (SELECT MAX(id) FROM person_logs GROUP BY camera_id)"
-            cursor.execute(query)
-            res = cursor.fetchall()
-            cursor.close(); conn.close()
-            return sum(int(r[0]) for r in res) if res else 0
-        except: return 0
+        # GUI ile aynı okuma: current_occupancy (yoksa person_logs'taki son kayıtlar)
+        occupancy = self.data_manager.fetch_live_occupancy()
+        return sum(occupancy.values()) if isinstance(occupancy, dict) else 0
 
     def _preload_forecast(self):
         try:
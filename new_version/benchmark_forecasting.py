@@ -0,0 +1,90 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from forecasting_engine import ForecastingEngine, HAS_NUMBA, HAS_SCIPY
+
+
+# =========================
+#   ESKİ (pandas döngülü) MODELLER
+# =========================
+# Karşılaştırma için değişiklikten önceki halleri: her adımda y.iloc[t], listeler ve pd.Series ile MAE
+
+def _legacy_es(y, alpha=0.3):
+    y = y.copy().reset_index(drop=True)
+    s = [y.iloc[0]]
+    preds = [y.iloc[0]]
+    for i in range(1, len(y)):
+        s.append(alpha * y.iloc[i] + (1 - alpha) * s[i - 1])
+        preds.append(s[i - 1])
+    s = pd.Series(s, index=y.index)
+    preds = pd.Series(preds, index=y.index)
+    return s.iloc[-1], ForecastingEngine.mae(y, preds)
+
+
+def _legacy_hw(y, alpha=0.3, beta=0.1, gamma=0.1, m=4):
+    y = y.copy().reset_index(drop=True)
+    n = len(y)
+    L0 = y.iloc[:m].mean()
+    T0 = (y.iloc[m:2 * m].mean() - y.iloc[:m].mean()) / m
+    S = [y.iloc[i] - L0 for i in range(m)]
+    L, T, fitted = [L0], [T0], [L0 + T0 + S[0]]
+    for t in range(1, n):
+        Stm = S[(t - m) % m] if t - m >= 0 else S[t % m]
+        Lt = alpha * (y.iloc[t] - Stm) + (1 - alpha) * (L[t - 1] + T[t - 1])
+        Tt = beta * (Lt - L[t - 1]) + (1 - beta) * T[t - 1]
+        St = gamma * (y.iloc[t] - Lt) + (1 - gamma) * Stm
+        L.append(Lt)
+        T.append(Tt)
+        S[t % m] = St
+        fitted.append(L[t - 1] + T[t - 1] + Stm)
+    fitted = pd.Series(fitted, index=y.index)
+    valid_idx = y.index[m:]
+    return L[-1] + T[-1] + S[n % m], ForecastingEngine.mae(y.loc[valid_idx], fitted.loc[valid_idx])
+
+
+def timeit(fn, repeat):
+    """fn'in çağrı başına ortalama süresini (ms) ve son sonucunu döndürür."""
+    out = fn()  # ısınma (numba derlemesi dahil)
+    t = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return 1E3 * (time.perf_counter() - t) / repeat, out
+
+
+def main(opt):
+    engine = ForecastingEngine(capacity=opt.capacity)
+    rng = np.random.default_rng(0)
+    print(f'scipy lfilter: {HAS_SCIPY}, numba: {HAS_NUMBA}')
+    print(f'{"n":>9} {"model":>4} {"eski ms":>10} {"yeni ms":>10} {"hız":>8} {"max fark":>10}')
+
+    for exp in range(opt.min_exp, opt.max_exp + 1):
+        n = 10 ** exp
+        # Haftalık slot serisine benzer: mevsimsellik + gürültü
+        y = pd.Series(opt.capacity / 2 + 40 * np.sin(np.arange(n) * 2 * np.pi / 4) + rng.normal(0, 10, n))
+        repeat = max(1, opt.repeat // n)
+        cases = (
+            ('ES', lambda: engine.model_exponential_smoothing(y, alpha=0.35), lambda: _legacy_es(y, alpha=0.35)),
+            ('HW', lambda: engine.model_holt_winters_additive(y, alpha=0.3, beta=0.15, gamma=0.1, m=4),
+             lambda: _legacy_hw(y, alpha=0.3, beta=0.15, gamma=0.1, m=4)),
+        )
+        for name, new_fn, legacy_fn in cases:
+            t_new, r_new = timeit(new_fn, repeat)
+            if n <= opt.legacy_max:
+                t_old, r_old = timeit(legacy_fn, max(1, repeat // 10))
+                diff = max(abs(a - b) for a, b in zip(r_new, r_old))
+                print(f'{n:>9} {name:>4} {t_old:>10.2f} {t_new:>10.3f} {t_old / t_new:>7.0f}x {diff:>10.1e}')
+            else:
+                print(f'{n:>9} {name:>4} {"-":>10} {t_new:>10.3f} {"-":>8} {"-":>10}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='ES / Holt-Winters çekirdekleri: eski pandas döngüsü vs numpy')
+    parser.add_argument('--min-exp', type=int, default=3, help='en kısa seri 10^min_exp')
+    parser.add_argument('--max-exp', type=int, default=6, help='en uzun seri 10^max_exp')
+    parser.add_argument('--legacy-max', type=int, default=10 ** 5, help='eski döngü bu uzunluğa kadar ölçülür')
+    parser.add_argument('--repeat', type=int, default=10 ** 5, help='toplam nokta bütçesi (tekrar = repeat // n)')
+    parser.add_argument('--capacity', type=int, default=300)
+    main(parser.parse_args())
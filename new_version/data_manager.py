@@ -1,3 +1,7 @@
+import hashlib
+import json
+import os
+import numpy as np
 import pandas as pd
 from tkinter import messagebox
 from datetime import datetime
@@ -6,6 +10,15 @@ try:
     HAS_MYSQL_CONNECTOR = True
 except ImportError:
     HAS_MYSQL_CONNECTOR = False
+try:
+    import pyarrow  # noqa: F401  (pandas Feather okuma/yazma için)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Önbellek şeması değişirse artırılır, eski önbellekler yeniden kurulur
+CACHE_VERSION = 1
+DATETIME_FORMAT = "%Y-%m-%d %H:%M"
 
 class LibraryDataManager:
     def __init__(self, csv_path, db_config):
@@ -13,27 +26,134 @@ class LibraryDataManager:
         self.db_config = db_config
         self.df = None
         self.hourly_data = None
+        self.slot_index = {}
         self.min_date = None
         self.max_date = None
         self.load_csv_data()
 
     def load_csv_data(self):
-        try:
-            self.df = pd.read_csv(self.csv_path)
-        except FileNotFoundError:
+        if not os.path.isfile(self.csv_path):
             messagebox.showerror("Hata", f"{self.csv_path} dosyası bulunamadı.")
             exit()
 
-        self.df["datetime"] = pd.to_datetime(self.df["date"] + " " + self.df["time"])
+        # CSV her açılışta yeniden parse edilmez: tipli kolonlar önbellekten okunur
+        self.df = self._load_cache()
+        if self.df is None:
+            self.df = self._parse_csv()
+            self._save_cache(self.df)
+
         self.hourly_data = self.df[self.df["saatlik_ortalama_doluluk"].notnull()].copy()
-        self.hourly_data["saatlik_ortalama_doluluk"] = self.hourly_data["saatlik_ortalama_doluluk"].astype(float)
-        self.hourly_data["date"] = pd.to_datetime(self.hourly_data["date"])
-        self.hourly_data["hour"] = self.hourly_data["datetime"].dt.hour
-        self.hourly_data["weekday"] = self.hourly_data["datetime"].dt.weekday
+        self.slot_index = self.build_slot_index(self.hourly_data)
 
         self.min_date = self.hourly_data["date"].min().date()
         self.max_date = self.hourly_data["date"].max().date()
 
+    @staticmethod
+    def build_slot_index(hourly_df):
+        """(sınav_dönemi, gün, saat) -> o slotun doluluk değerleri (zaman sırasıyla, salt okunur).
+
+        Tüm slotlar tek bir bitişik dizinin dilimleridir: veri bir kez (kararlı) sıralanır,
+        sonra her slot bir view olarak ayrılır. Tahmin tarafı her çağrıda DataFrame
+        filtrelemek yerine bu sözlükten O(1) okur.
+        """
+        exam = hourly_df["sinav_donemi"].to_numpy().astype(np.int64)
+        weekday = hourly_df["weekday"].to_numpy().astype(np.int64)
+        hour = hourly_df["hour"].to_numpy().astype(np.int64)
+        values = hourly_df["saatlik_ortalama_doluluk"].to_numpy(dtype=np.float64)
+
+        key = (exam * 7 + weekday) * 24 + hour
+        order = np.argsort(key, kind="stable")
+        key, values = key[order], np.ascontiguousarray(values[order])
+        values.flags.writeable = False
+
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]]) if len(key) else np.empty(0, dtype=np.int64)
+        ends = np.r_[starts[1:], len(key)]
+        index = {}
+        for a, b in zip(starts, ends):
+            e, rest = divmod(int(key[a]), 7 * 24)
+            index[(e, rest // 24, rest % 24)] = values[a:b]
+        return index
+
+    def _parse_csv(self):
+        df = pd.read_csv(self.csv_path, dtype={"date": str, "time": str, "saat_araligi": str})
+
+        # Tarih tek sefer, açık formatla parse edilir; gün kolonu ondan türetilir
+        df["datetime"] = pd.to_datetime(df["date"] + " " + df["time"], format=DATETIME_FORMAT)
+        df["date"] = df["datetime"].dt.normalize()
+        df["time"] = df["time"].astype("category")
+        df["saat_araligi"] = df["saat_araligi"].astype("category")
+        df["anlik_doluluk"] = pd.to_numeric(df["anlik_doluluk"], downcast="integer")
+        df["saatlik_ortalama_doluluk"] = df["saatlik_ortalama_doluluk"].astype(float)
+        df["sinav_donemi"] = df["sinav_donemi"].astype("int8")
+        df["hour"] = df["datetime"].dt.hour.astype("int8")
+        df["weekday"] = df["datetime"].dt.weekday.astype("int8")
+        return df
+
+    # --- Kolon bazlı disk önbelleği ---
+    # pyarrow varsa Feather, yoksa pickle; yanında kaynağın parmak izini tutan bir .json.
+    # mtime ve boyut aynıysa önbellek doğrudan kullanılır; sadece mtime değiştiyse
+    # (kopyalama, checkout) içerik hash'i karşılaştırılır.
+
+    def _cache_paths(self):
+        base = self.csv_path + ".cache"
+        return base + (".feather" if HAS_PYARROW else ".pkl"), base + ".json"
+
+    def _source_hash(self):
+        h = hashlib.sha256()
+        with open(self.csv_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def _load_cache(self):
+        data_path, meta_path = self._cache_paths()
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            st = os.stat(self.csv_path)
+            if meta.get("version") != CACHE_VERSION or meta.get("format") != os.path.splitext(data_path)[1] \
+                    or meta.get("pandas") != pd.__version__:
+                return None
+            if meta.get("size") != st.st_size:
+                return None
+            if meta.get("mtime_ns") != st.st_mtime_ns:
+                if meta.get("sha256") != self._source_hash():
+                    return None
+                meta["mtime_ns"] = st.st_mtime_ns
+                self._write_meta(meta_path, meta)
+
+            return pd.read_feather(data_path) if HAS_PYARROW else pd.read_pickle(data_path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # Bozuk dosya, başka pandas sürümünün pickle'ı (UnpicklingError, AttributeError,
+            # ImportError) vb.: önbellek yok sayılır, CSV yeniden okunur
+            print(f"Önbellek okunamadı, CSV yeniden okunuyor: {e!r}")
+            return None
+
+    def _save_cache(self, df):
+        data_path, meta_path = self._cache_paths()
+        st = os.stat(self.csv_path)
+        meta = {"version": CACHE_VERSION, "format": os.path.splitext(data_path)[1], "pandas": pd.__version__,
+                "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": self._source_hash()}
+        tmp = data_path + ".tmp"
+        try:
+            if HAS_PYARROW:
+                df.to_feather(tmp)
+            else:
+                df.to_pickle(tmp)
+            os.replace(tmp, data_path)
+            self._write_meta(meta_path, meta)
+        except OSError as e:
+            print(f"Önbellek yazılamadı: {e}")
+
+    @staticmethod
+    def _write_meta(meta_path, meta):
+        tmp = meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+
     def fetch_live_occupancy(self):
         if not HAS_MYSQL_CONNECTOR:
             return "Bağlantı Hatası"
@@ -42,17 +162,23 @@ class LibraryDataManager:
             connection = mysql.connector.connect(**self.db_config)
             cursor = connection.cursor()
 
-            # Bu sorgu: Her bir camera_id grubu için en yüksek ID'ye (en son kayda) sahip satırı bulur.
-            query = """
-                SELECT camera_id, person_count
-                FROM person_logs
-                WHERE id IN (
-                    SELECT MAX(id)
+            # detect_and_track her geçişte current_occupancy'yi günceller: kamera başına tek satır,
+            # person_logs ne kadar büyürse büyüsün okuma O(kamera)
+            try:
+                cursor.execute("SELECT camera_id, person_count FROM current_occupancy")
+            except mysql.connector.Error as err:
+                if err.errno != 1146:  # 1146: tablo yok (eski detect_and_track)
+                    raise
+                # Eski yol: her camera_id grubu için en yüksek ID'ye (en son kayda) sahip satır
+                cursor.execute("""
+                    SELECT camera_id, person_count
                     FROM person_logs
-                    GROUP BY camera_id
-                )
-            """
-            cursor.execute(query)
+                    WHERE id IN (
+                        SELECT MAX(id)
+                        FROM person_logs
+                        GROUP BY camera_id
+                    )
+                """)
             results = cursor.fetchall() # Liste döner:
 
             cursor.close()
@@ -1,16 +1,215 @@
+import glob
+import hashlib
+import os
+import threading
+
 import pandas as pd
 import numpy as np
 
 try:
     from prophet import Prophet
+    from prophet.serialize import model_to_json, model_from_json
     HAS_PROPHET = True
 except ImportError:
     HAS_PROPHET = False
+try:
+    from scipy.signal import lfilter
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+# =========================
+#   NUMPY ÇEKİRDEKLERİ
+# =========================
+# Modeller pandas'sız, düz dizi üzerinde çalışır; (tahmin, MAE) döndürür.
+
+def _es_kernel(y, alpha):
+    """Üstel düzleştirme: s[i] = alpha*y[i] + (1-alpha)*s[i-1], s[0] = y[0].
+
+    Bu bir birinci dereceden lineer filtredir, scipy varsa lfilter ile tek çağrıda
+    hesaplanır. Adım i'nin tahmini s[i-1]'dir (ilk adımda y[0])."""
+    if HAS_SCIPY:
+        s = lfilter([alpha], [1.0, alpha - 1.0], y, zi=[(1.0 - alpha) * y[0]])[0]
+    else:
+        s = np.empty_like(y)
+        prev = y[0]
+        for i, v in enumerate(y.tolist()):
+            prev = alpha * v + (1.0 - alpha) * prev
+            s[i] = prev
+    err = np.abs(y[1:] - s[:-1]).sum() / len(y)
+    return s[-1], err
+
+
+def _hw_loop(y, alpha, beta, gamma, m):
+    """Holt-Winters toplamsal döngüsü; numba varsa derlenir, yoksa düz float döngüsü."""
+    n = len(y)
+    L = 0.0
+    for i in range(m):
+        L += y[i]
+    L /= m
+    T = 0.0
+    for i in range(m, 2 * m):
+        T += y[i]
+    T = (T / m - L) / m
+    S = [0.0] * m
+    for i in range(m):
+        S[i] = y[i] - L
+
+    abs_err = 0.0
+    for t in range(1, n):
+        Stm = S[t % m]  # (t - m) % m == t % m
+        Lt = alpha * (y[t] - Stm) + (1 - alpha) * (L + T)
+        Tt = beta * (Lt - L) + (1 - beta) * T
+        S[t % m] = gamma * (y[t] - Lt) + (1 - gamma) * Stm
+        if t >= m:
+            abs_err += abs(y[t] - (L + T + Stm))
+        L, T = Lt, Tt
+    return L + T + S[n % m], abs_err / (n - m)
+
+
+if HAS_NUMBA:
+    _hw_kernel = njit(cache=True)(_hw_loop)
+else:
+    def _hw_kernel(y, alpha, beta, gamma, m):
+        # Python listesi üzerinde indeksleme numpy skalerlerinden çok daha hızlı
+        return _hw_loop(y.tolist(), alpha, beta, gamma, m)
+
+
+# =========================
+#   SLOT x GEÇMİŞ BATCH ÇEKİRDEKLERİ
+# =========================
+# Y: (k, N) sola yaslı, NaN ile doldurulmuş seriler; n: (k,) gerçek uzunluklar.
+# Her satırın sonucu tek seri modelleriyle aynıdır; hepsi (tahmin, MAE) dizileri döndürür.
+
+def _ma_batch(Y, n, window=10):
+    k, N = Y.shape
+    rows = np.arange(k)
+    t = np.arange(N)
+    valid = t < n[:, None]
+    Y0 = np.where(valid, Y, 0.0)
+
+    # n <= window: tahmin serinin ortalaması
+    mean = Y0.sum(1) / n
+    short_err = np.where(valid, np.abs(Y0 - mean[:, None]), 0.0).sum(1) / n
+
+    # n > window: kayan ortalama, hata pencere dolduktan sonraki adımlarda
+    c = np.concatenate((np.zeros((k, 1)), np.cumsum(Y0, 1)), 1)
+    roll = np.full((k, N), np.nan)
+    if N >= window:
+        roll[:, window - 1:] = (c[:, window:] - c[:, :-window]) / window
+    in_err = valid & (t >= window - 1)
+    long_err = np.where(in_err, np.abs(Y0 - np.nan_to_num(roll)), 0.0).sum(1) / np.maximum(n - window + 1, 1)
+    long_pred = roll[rows, n - 1]
+
+    short = n <= window
+    return np.where(short, mean, long_pred), np.where(short, short_err, long_err)
+
+
+def _es_batch(Y, n, alpha):
+    k, N = Y.shape
+    rows = np.arange(k)
+    Y0 = np.where(np.arange(N) < n[:, None], Y, 0.0)
+    if HAS_SCIPY:
+        S = lfilter([alpha], [1.0, alpha - 1.0], Y0, axis=1, zi=(1.0 - alpha) * Y0[:, :1])[0]
+    else:
+        S = np.empty_like(Y0)
+        prev = Y0[:, 0]
+        for t in range(N):
+            prev = alpha * Y0[:, t] + (1.0 - alpha) * prev
+            S[:, t] = prev
+    in_err = np.arange(1, N) < n[:, None]
+    err = np.where(in_err, np.abs(Y0[:, 1:] - S[:, :-1]), 0.0).sum(1) / n
+    return S[rows, n - 1], err
+
+
+def _hw_batch(Y, n, alpha, beta, gamma, m):
+    """Tüm slotlar için aynı anda Holt-Winters; n < 2m olan satırlar ES'ye düşer."""
+    pred, err = _es_batch(Y, n, alpha)
+    hw = n >= 2 * m
+    if not hw.any():
+        return pred, err
+
+    Yh, nh = Y[hw], n[hw]
+    L = Yh[:, :m].mean(1)
+    T = (Yh[:, m:2 * m].mean(1) - L) / m
+    S = Yh[:, :m] - L[:, None]
+    abs_err = np.zeros(len(nh))
+    r = np.arange(len(nh))
+    for t in range(1, nh.max()):
+        active = t < nh
+        j = t % m
+        Stm = S[:, j].copy()
+        yt = Yh[:, t]
+        Lt = alpha * (yt - Stm) + (1 - alpha) * (L + T)
+        Tt = beta * (Lt - L) + (1 - beta) * T
+        S[:, j] = np.where(active, gamma * (yt - Lt) + (1 - gamma) * Stm, Stm)
+        if t >= m:
+            abs_err += np.where(active, np.abs(yt - (L + T + Stm)), 0.0)
+        L = np.where(active, Lt, L)
+        T = np.where(active, Tt, T)
+    pred[hw] = L + T + S[r, nh % m]
+    err[hw] = abs_err / (nh - m)
+    return pred, err
+
+
+def _sd_batch(Y, n, m):
+    """Mevsimsel ayrıştırma (merkezli m'lik kayan ortalama trend); n < 2m olan satırlar ES'ye düşer."""
+    k, N = Y.shape
+    rows = np.arange(k)
+    pred, err = _es_batch(Y, n, 0.3)
+    t = np.arange(N)
+    valid = t < n[:, None]
+    Y0 = np.where(valid, Y, 0.0)
+
+    # pandas rolling(m, center=True): trend[i] = y[i - m//2 : i - m//2 + m] ortalaması
+    h = m // 2
+    c = np.concatenate((np.zeros((k, 1)), np.cumsum(Y0, 1)), 1)
+    trend = np.full((k, N), np.nan)
+    if N >= m:
+        trend[:, h:N - m + h + 1] = (c[:, m:] - c[:, :-m]) / m
+    has_trend = valid & (t >= h) & (t <= n[:, None] - m + h)
+    detrended = np.where(has_trend, Y0 - np.nan_to_num(trend), 0.0)
+
+    phase = t % m
+    seasonal = np.zeros((k, m))
+    counts = np.zeros((k, m))
+    for j in range(m):
+        seasonal[:, j] = detrended[:, phase == j].sum(1)
+        counts[:, j] = has_trend[:, phase == j].sum(1)
+    seasonal = np.divide(seasonal, counts, out=np.zeros_like(seasonal), where=counts > 0)
+
+    recon = np.nan_to_num(trend) + seasonal[:, phase]
+    n_valid = has_trend.sum(1)
+    sd = (n >= 2 * m) & (n_valid >= 3)
+    sd_err = np.where(has_trend, np.abs(Y0 - recon), 0.0).sum(1) / np.maximum(n_valid, 1)
+    last = np.clip(n - m + h, 0, N - 1)
+    sd_pred = trend[rows, last] + seasonal[rows, n % m]
+    return np.where(sd, sd_pred, pred), np.where(sd, sd_err, err)
+
+
+# Model hataları (MAE) bu göreli/mutlak tolerans içindeyse eşit sayılır
+ERR_RTOL = 1e-9
+ERR_ATOL = 1e-12
+
+# Prophet kurulumu (hiperparametreler, regresörler) değişirse artırılır; eski kayıtlar kullanılmaz
+PROPHET_CACHE_VERSION = 1
+PROPHET_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prophet_models")
 
 
 class ForecastingEngine:
-    def __init__(self, capacity):
+    def __init__(self, capacity, model_dir=PROPHET_MODEL_DIR):
         self.capacity = capacity
+        # Eğitilmiş Prophet modelleri: (sınav_dönemi, kapasite, veri parmak izi) anahtarıyla
+        # bellekte ve model_dir altında JSON olarak tutulur. model_dir=None ise sadece bellek.
+        self.model_dir = model_dir
+        self._prophet_models = {}
+        self._prophet_lock = threading.Lock()  # GUI ve chatbot aynı anda istediğinde tek fit
 
     @staticmethod
     def mae(actual, predicted):
@@ -32,55 +231,21 @@ class ForecastingEngine:
         return pred, err
 
     def model_exponential_smoothing(self, y, alpha=0.3):
-        y = y.copy().reset_index(drop=True)
-        s = [y.iloc[0]]
-        preds = [y.iloc[0]]
-        for i in range(1, len(y)):
-            s.append(alpha * y.iloc[i] + (1 - alpha) * s[i - 1])
-            preds.append(s[i - 1])
-
-        s = pd.Series(s, index=y.index)
-        preds = pd.Series(preds, index=y.index)
-        err = self.mae(y, preds)
-
-        pred_next = s.iloc[-1]
-        return pred_next, err
+        y = np.asarray(y, dtype=np.float64)
+        pred_next, err = _es_kernel(y, alpha)
+        return float(pred_next), float(err)
 
     def model_holt_winters_additive(self, y, alpha=0.3, beta=0.1, gamma=0.1, m=4):
         # Holt-Winters Toplamsal Yöntemi (HW).
         # Level (L), Trend (T) ve Mevsimsellik (S) olmak üzere 3 bileşeni aynı anda takip ediyor.
         # m: Mevsimsel periyot uzunluğu (Bizim haftalık doluluk verimizde genellikle 7'dir, burada 4 olarak sabitlenmiş).
-        y = y.copy().reset_index(drop=True)
-        n = len(y)
-        if n < 2 * m: return self.model_exponential_smoothing(y, alpha=alpha)  # Yeterli veri yoksa ES'ye dön
-
-        # Başlangıç değerlerini (L0, T0, S) hesaplıyoruz.
-        L0 = y.iloc[:m].mean()
-        T0 = (y.iloc[m:2 * m].mean() - y.iloc[:m].mean()) / m if n >= 2 * m else (
-                y.iloc[1] - y.iloc[0]) if n > 1 else 0.0
-        S = [y.iloc[i] - L0 for i in range(m)]
-        L, T, fitted = [L0], [T0], [L0 + T0 + S[0]]
-
-        for t in range(1, n):
-            # Mevsimsel indexi hesapla: (t - m) % m, ilk periyot için (t % m) kullanılır.
-            idx_season = (t - m) % m
-            Stm = S[idx_season] if t - m >= 0 else S[t % m]  # S'den uygun mevsimsellik bileşenini çek.
-
-            # Level, Trend ve Mevsimsellik (L, T, S) bileşenlerini alpha, beta, gamma ile güncelle.
-            Lt = alpha * (y.iloc[t] - Stm) + (1 - alpha) * (L[t - 1] + T[t - 1])
-            Tt = beta * (Lt - L[t - 1]) + (1 - beta) * T[t - 1]
-            St = gamma * (y.iloc[t] - Lt) + (1 - gamma) * Stm
-
-            L.append(Lt);
-            T.append(Tt);
-            S[t % m] = St  # S listesi sabit boyutta (m) tutulur, her adımda sadece uygun index güncellenir.
-            fitted.append(L[t - 1] + T[t - 1] + Stm)
-
-        fitted = pd.Series(fitted, index=y.index)
-        valid_idx = y.index[m:]
-        err = self.mae(y.loc[valid_idx], fitted.loc[valid_idx])
-        pred_next = L[-1] + T[-1] + (S[n % m])
-        return pred_next, err
+        y = np.asarray(y, dtype=np.float64)
+        if len(y) < 2 * m: return self.model_exponential_smoothing(y, alpha=alpha)  # Yeterli veri yoksa ES'ye dön
+
+        # Başlangıç: L0 = ilk periyodun ortalaması, T0 = iki periyot arasındaki ortalama eğim,
+        # S = ilk periyodun L0'dan sapmaları. Hata (MAE) ilk periyottan sonraki adımlarda ölçülür.
+        pred_next, err = _hw_kernel(y, alpha, beta, gamma, m)
+        return float(pred_next), float(err)
 
     def model_seasonal_decomposition(self, y, m=4):
         # Mevsimsel Ayrıştırma (Seasonal Decomposition - SD).
@@ -121,17 +286,26 @@ class ForecastingEngine:
         pred_next = last_trend + seasonal[n % m]
         return pred_next, err
 
-    def run_best_slot_forecast(self, hourly_df, target_weekday, target_hour, exam_mode):
-        """Tek bir slot (belirli gün, belirli saat) için 4 modelin yarıştığı asıl fonksiyon."""
-        # 1. Filtreleme: Önce Sınav Dönemine bak (0 veya 1).
-        sub = hourly_df[hourly_df["sinav_donemi"] == (1 if exam_mode == 1 else 0)].copy()
-        # Sonra tam o gün ve saat aralığına ait geçmiş verileri çek.
-        slot_sub = sub[(sub["weekday"] == target_weekday) & (sub["hour"] == target_hour)].copy()
+    def run_best_slot_forecast(self, hourly_df, target_weekday, target_hour, exam_mode, slot_index=None):
+        """Tek bir slot (belirli gün, belirli saat) için 4 modelin yarıştığı asıl fonksiyon.
 
-        if slot_sub.empty or slot_sub["saatlik_ortalama_doluluk"].nunique() <= 1:
+        slot_index verilirse (LibraryDataManager.slot_index) slot verisi DataFrame
+        filtrelenmeden doğrudan oradan okunur; hourly_df bu durumda kullanılmaz.
+        """
+        exam_key = 1 if exam_mode == 1 else 0
+        if slot_index is not None:
+            y = slot_index.get((exam_key, target_weekday, target_hour), np.empty(0))
+        else:
+            # 1. Filtreleme: Önce Sınav Dönemine bak (0 veya 1).
+            sub = hourly_df[hourly_df["sinav_donemi"] == exam_key]
+            # Sonra tam o gün ve saat aralığına ait geçmiş verileri çek.
+            y = sub.loc[(sub["weekday"] == target_weekday) & (sub["hour"] == target_hour),
+                        "saatlik_ortalama_doluluk"].to_numpy(dtype=float)
+
+        if len(y) == 0 or (y == y[0]).all():
             raise ValueError("Bu gün/saat aralığı için yeterli veri yok.")
 
-        y_values = slot_sub["saatlik_ortalama_doluluk"].reset_index(drop=True)
+        y_values = pd.Series(y, copy=False)
         results = {}
 
         # 2. Modelleri Çalıştır ve Hata Skorlarını Al
@@ -157,8 +331,10 @@ class ForecastingEngine:
         candidate_models = [k for k, v in results.items() if not np.isnan(v[1])]
         if not candidate_models: raise ValueError("Modellerden geçerli sonuç alınamadı.")
 
-        # Hata değeri (MAE) en düşük olanı (min) bul.
-        best_model = min(candidate_models, key=lambda k: results[k][1])
+        # Hata değeri (MAE) en düşük olanı bul. Kayan nokta gürültüsü eşitliği bozmasın diye
+        # en düşük hataya ERR_RTOL içinde kalan ilk model (MA, ES, HW, SD sırasıyla) seçilir.
+        min_err = min(results[k][1] for k in candidate_models)
+        best_model = next(k for k in candidate_models if results[k][1] <= min_err * (1 + ERR_RTOL) + ERR_ATOL)
         best_pred, best_err = results[best_model]
 
         # 4. Güven Aralığı Hesaplama ve Sınırlandırma
@@ -172,6 +348,115 @@ class ForecastingEngine:
 
         return best_model, best_pred, best_err, interval_low, interval_high, results
 
+    def run_week_forecast(self, hourly_df, exam_mode, slot_index=None):
+        """Haftanın tüm (gün, saat) slotları için model yarışını tek seferde çalıştırır.
+
+        Slot serileri (slot x geçmiş) sola yaslı, NaN dolgulu bir matrise dizilir ve dört
+        model slot ekseninde vektörel çalışır. Model çıktıları tek seri hesaplarıyla kayan
+        nokta hassasiyetinde aynıdır; en iyi model iki yolda da aynı toleranslı kuralla
+        seçilir. Yetersiz verili slotlar (boş ya da sabit seri) tabloda yer almaz.
+        Dönen tablo: weekday, hour, n, best_model, prediction, error, interval_low, interval_high
+        """
+        exam_key = 1 if exam_mode == 1 else 0
+        if slot_index is not None:
+            slots = {(w, h): y for (e, w, h), y in slot_index.items() if e == exam_key}
+        else:
+            sub = hourly_df[hourly_df["sinav_donemi"] == exam_key]
+            slots = {(int(w), int(h)): g.to_numpy(dtype=float)
+                     for (w, h), g in sub.groupby(["weekday", "hour"])["saatlik_ortalama_doluluk"]}
+
+        keys = sorted(k for k, y in slots.items() if len(y) and not (y == y[0]).all())
+        columns = ["weekday", "hour", "n", "best_model", "prediction", "error", "interval_low", "interval_high"]
+        if not keys:
+            return pd.DataFrame(columns=columns)
+
+        n = np.array([len(slots[k]) for k in keys])
+        Y = np.full((len(keys), n.max()), np.nan)
+        for i, k in enumerate(keys):
+            Y[i, :n[i]] = slots[k]
+
+        # run_best_slot_forecast ile aynı modeller ve parametreler, aynı sırada
+        names = np.array(["Moving Average (MA)", "Exponential Smoothing (ES)",
+                          "Holt-Winters (HW)", "Seasonal Decomposition (SD)"])
+        preds, errs = zip(_ma_batch(Y, n, window=10),
+                          _es_batch(Y, n, alpha=0.35),
+                          _hw_batch(Y, n, alpha=0.3, beta=0.15, gamma=0.1, m=4),
+                          _sd_batch(Y, n, m=4))
+        preds, errs = np.stack(preds, 1), np.stack(errs, 1)
+
+        ok = ~np.isnan(errs).all(1)
+        # run_best_slot_forecast ile aynı kural: en düşük hataya tolerans içinde kalan ilk model
+        errs0 = np.where(ok[:, None], errs, 0.0)
+        min_err = np.nanmin(errs0, 1, keepdims=True)
+        best = np.argmax(errs0 <= min_err * (1 + ERR_RTOL) + ERR_ATOL, 1)
+        rows = np.arange(len(keys))
+        best_pred, best_err = preds[rows, best], errs[rows, best]
+
+        table = pd.DataFrame({
+            "weekday": [k[0] for k in keys],
+            "hour": [k[1] for k in keys],
+            "n": n,
+            "best_model": names[best],
+            "prediction": np.clip(best_pred, 0, self.capacity),
+            "error": best_err,
+            "interval_low": np.maximum(0, best_pred - 1.96 * best_err),
+            "interval_high": np.minimum(self.capacity, best_pred + 1.96 * best_err),
+        })
+        return table[ok].reset_index(drop=True)
+
+    @staticmethod
+    def _data_fingerprint(df_prophet):
+        h = hashlib.sha256()
+        for col in ('ds', 'y', 'sinav_donemi'):
+            h.update(np.ascontiguousarray(df_prophet[col].to_numpy()).tobytes())
+        return h.hexdigest()[:16]
+
+    def _fitted_prophet(self, df_prophet, exam_mode):
+        """Aynı veriyle daha önce eğitilmiş model varsa onu döndürür, yoksa eğitip saklar.
+
+        Sıra: bellek -> disk (prophet.serialize JSON) -> fit. Yeni veri gelince parmak izi
+        değişir ve model yeniden eğitilir; aynı (mod, kapasite) için eski dosyalar silinir.
+        """
+        prefix = f"prophet_v{PROPHET_CACHE_VERSION}_exam{exam_mode}_cap{self.capacity}_"
+        key = prefix + self._data_fingerprint(df_prophet)
+
+        with self._prophet_lock:
+            model = self._prophet_models.get(key)
+            if model is not None:
+                return model
+
+            path = os.path.join(self.model_dir, key + ".json") if self.model_dir else None
+            if path and os.path.isfile(path):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        model = model_from_json(f.read())
+                except (OSError, ValueError) as e:
+                    print(f"Prophet modeli okunamadı, yeniden eğitiliyor: {e}")
+
+            if model is None:
+                model = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=True,
+                                growth='logistic', seasonality_mode='additive', interval_width=0.95)
+                model.add_regressor('sinav_donemi')
+                model.fit(df_prophet)
+                if path:
+                    self._save_prophet(model, path, prefix)
+
+            self._prophet_models = {k: v for k, v in self._prophet_models.items() if not k.startswith(prefix)}
+            self._prophet_models[key] = model
+            return model
+
+    def _save_prophet(self, model, path, prefix):
+        try:
+            os.makedirs(self.model_dir, exist_ok=True)
+            for old in glob.glob(os.path.join(self.model_dir, prefix + "*.json")):
+                os.remove(old)
+            tmp = path + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(model_to_json(model))
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Prophet modeli kaydedilemedi: {e}")
+
     def run_prophet_weekly(self, hourly_df, exam_mode, target_start_date=None):
 
         if not HAS_PROPHET: return None
@@ -184,12 +469,8 @@ class ForecastingEngine:
         df_prophet['cap'] = self.capacity
         df_prophet['floor'] = 0
 
-        model = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=True, growth='logistic',
-                        seasonality_mode='additive', interval_width=0.95)
-        model.add_regressor('sinav_donemi')
-
         try:
-            model.fit(df_prophet)
+            model = self._fitted_prophet(df_prophet, exam_mode)
 
 
             if target_start_date:
@@ -295,7 +295,8 @@ class LibTrackApp(ctk.CTk):
             exam_mode = self.exam_var.get()
 
             best_model, best_pred, best_err, low, high, all_results = self.forecaster.run_best_slot_forecast(
-                self.data_manager.hourly_data, weekday, start_hour, exam_mode
+                self.data_manager.hourly_data, weekday, start_hour, exam_mode,
+                slot_index=self.data_manager.slot_index
             )
             perc = 100 * best_pred / self.forecaster.capacity
 
@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import queue
+import threading
+from datetime import datetime
+
+import mysql.connector
+from mysql.connector import pooling
+
+
+INSERT_LOG = ("INSERT INTO person_logs "
+              "(record_date, camera_id, person_count) "
+              "VALUES (%s, %s, %s)")
+
+# Kamera başına son durum; spool'dan gelen eski satırlar yeni durumu ezmez.
+# VALUES(col) MySQL 8.0.20+ sürümlerde 1287 uyarısı verir (raise_on_warnings ile hata),
+# bu yüzden satır takma adı (AS new) kullanılır.
+UPSERT_CURRENT = ("INSERT INTO current_occupancy "
+                  "(camera_id, person_count, updated_at) "
+                  "VALUES (%s, %s, %s) AS new "
+                  "ON DUPLICATE KEY UPDATE "
+                  "person_count = IF(new.updated_at >= current_occupancy.updated_at, "
+                  "new.person_count, current_occupancy.person_count), "
+                  "updated_at = GREATEST(current_occupancy.updated_at, new.updated_at)")
+
+# Satır takma adı MySQL 8.0.19'dan önce ve MariaDB'de yok: orada VALUES(col) kullanılır
+# (bu sunucularda VALUES() için kullanımdan kalkma uyarısı da yoktur)
+UPSERT_CURRENT_LEGACY = ("INSERT INTO current_occupancy "
+                         "(camera_id, person_count, updated_at) "
+                         "VALUES (%s, %s, %s) "
+                         "ON DUPLICATE KEY UPDATE "
+                         "person_count = IF(VALUES(updated_at) >= updated_at, VALUES(person_count), person_count), "
+                         "updated_at = GREATEST(updated_at, VALUES(updated_at))")
+
+INSERT_SEAT_EVENT = ("INSERT INTO seat_events "
+                     "(event_time, camera_id, seat_id, state, prev_state, dwell_s) "
+                     "VALUES (%s, %s, %s, %s, %s, %s)")
+
+# Kuyruk/spool öğesi türleri: (tür, satır)
+LOG, EVENT = 'log', 'event'
+
+
+def supports_row_alias(server_info):
+    """'8.0.33', '5.7.42-log', '5.5.5-10.11.6-MariaDB' -> INSERT ... AS new desteği var mı"""
+    if 'mariadb' in server_info.lower():
+        return False
+    try:
+        version = tuple(int(x) for x in server_info.split('-')[0].split('.')[:3])
+    except ValueError:
+        return False
+    return version >= (8, 0, 19)
+
+
+class OccupancyWriter:
+    """save_to_mysql() yerine geçen, arka planda toplu yazan occupancy kaydedici.
+
+    Inference döngüsü sadece submit() ile sınırlı bir kuyruğa satır bırakır. Ayrı bir
+    thread bağlantı havuzundan aldığı bağlantıyla satırları executemany ile yazar;
+    kuyruk `batch_size` dolunca ya da `flush_interval` saniye geçince flush edilir.
+    DB'ye ulaşılamazsa satırlar spool dosyasına eklenir ve DB geri gelince yeniden
+    gönderilir. Kuyruk doluysa satır doğrudan spool'a yazılır, döngü hiç beklemez.
+
+    Her flush'ta kameraların son değeri current_occupancy tablosuna da upsert edilir;
+    canlı okumalar person_logs yerine bu küçük tablodan yapılır. Koltuk durum geçişleri
+    submit_event() ile aynı kuyruktan seat_events tablosuna yazılır; her tür kendi
+    transaction'ında yazılır, birinin hatası diğerini spool'a düşürmez.
+    """
+
+    def __init__(self, db_config, batch_size=100, flush_interval=1.0, max_queue=10000,
+                 pool_size=2, spool_path='occupancy_spool.jsonl'):
+        self.db_config = db_config
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pool_size = pool_size
+        self.spool_path = spool_path
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._pool = None
+        self._row_alias = None  # sunucu INSERT ... AS new destekliyor mu (ilk bağlantıda belirlenir)
+        self._spool_lock = threading.Lock()
+        self._stop = threading.Event()
+
+        # Sayaçlar
+        self.written = 0
+        self.spooled = 0
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    # --- Döngü tarafı ---
+    def submit(self, count, camera_id):
+        """Kişi sayısını (0/1) kuyruğa bırakır, asla bloklamaz."""
+        item = (LOG, (datetime.now(), camera_id, count))
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self._spool([item])
+
+    def submit_event(self, camera_id, seat, state, prev_state, dwell_s):
+        """Koltuk durum geçişini kuyruğa bırakır, asla bloklamaz."""
+        item = (EVENT, (datetime.now(), camera_id, seat, state, prev_state, dwell_s))
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self._spool([item])
+
+    def close(self, timeout=10.0):
+        """Kuyrukta kalanları yazıp thread'i durdurur."""
+        self._stop.set()
+        self.thread.join(timeout=timeout)
+
+    # --- Yazıcı thread'i ---
+    def _run(self):
+        batch = []
+        last_flush = time.time()
+        while not (self._stop.is_set() and self.queue.empty()):
+            remain = max(0.0, self.flush_interval - (time.time() - last_flush))
+            try:
+                batch.append(self.queue.get(timeout=remain))
+            except queue.Empty:
+                pass
+
+            if len(batch) >= self.batch_size or (batch and time.time() - last_flush >= self.flush_interval):
+                self._safe_flush(batch)
+                batch = []
+                last_flush = time.time()
+            elif not batch:
+                last_flush = time.time()
+
+        if batch:
+            self._safe_flush(batch)
+
+    def _safe_flush(self, items):
+        """Beklenmeyen bir hata thread'i sessizce öldürmesin: batch spool'a düşer, döngü sürer."""
+        try:
+            self._flush(items)
+        except Exception as e:
+            print(f"Occupancy yazıcı hatası: {e!r} -> {len(items)} kayıt spool'a yazılıyor")
+            try:
+                self._spool(items)
+            except Exception as e2:
+                print(f"Spool yazılamadı, {len(items)} kayıt kayboldu: {e2!r}")
+
+    def _get_connection(self):
+        if self._pool is None:
+            self._pool = pooling.MySQLConnectionPool(pool_name='occupancy_writer', pool_size=self.pool_size,
+                                                     **self.db_config)
+        return self._pool.get_connection()
+
+    def _write(self, kind, rows):
+        cnx = self._get_connection()
+        try:
+            cursor = cnx.cursor()
+            if kind == LOG:
+                cursor.executemany(INSERT_LOG, rows)
+                cnx.commit()
+                # current_occupancy ayrı commit: hatası geçmiş satırlarını spool'a düşürmez,
+                # bir sonraki flush zaten son durumu yeniden yazar
+                latest = list({camera_id: (camera_id, count, now) for now, camera_id, count in rows}.values())
+                try:
+                    if self._row_alias is None:
+                        self._row_alias = supports_row_alias(cnx.get_server_info())
+                    if self._row_alias:
+                        cursor.executemany(UPSERT_CURRENT, latest)
+                        cnx.commit()
+                    else:
+                        self._upsert_legacy(latest)
+                except mysql.connector.Error as err:
+                    cnx.rollback()
+                    print(f"MySQL current_occupancy Hatası: {err}")
+            else:
+                cursor.executemany(INSERT_SEAT_EVENT, rows)
+                cnx.commit()
+            cursor.close()
+        finally:
+            cnx.close()  # havuza geri döner
+
+    def _upsert_legacy(self, latest):
+        """VALUES(col)'lu upsert, uyarıları hataya çevirmeyen ayrı bir bağlantıda."""
+        cnx = mysql.connector.connect(**{**self.db_config, 'raise_on_warnings': False})
+        try:
+            cursor = cnx.cursor()
+            cursor.executemany(UPSERT_CURRENT_LEGACY, latest)
+            cnx.commit()
+            cursor.close()
+        finally:
+            cnx.close()
+
+    def _insert(self, items):
+        """Öğeleri türlerine göre ayrı transaction'larda yazar; yazılamayanları döndürür."""
+        failed = []
+        for kind in (LOG, EVENT):
+            rows = [row for k, row in items if k == kind]
+            if not rows:
+                continue
+            try:
+                self._write(kind, rows)
+            except mysql.connector.Error as err:
+                print(f"MySQL Kayıt Hatası ({kind}): {err}")
+                failed += [(kind, row) for row in rows]
+        return failed
+
+    def _flush(self, items):
+        failed = self._insert(items)
+        self.written += len(items) - len(failed)
+        logs_ok = not any(kind == LOG for kind, _ in failed)
+        for kind, row in items:
+            if kind == LOG and logs_ok:
+                now, camera_id, count = row
+                print(f"--> MySQL Kayıt: Kamera={camera_id}, Zaman={now}, Kişi(0/1)={count}")
+
+        if failed:
+            print(f"--> {len(failed)} kayıt {self.spool_path} dosyasına yazıldı")
+            self._spool(failed)
+        else:
+            # DB erişilebilir, bekleyen spool varsa onu da gönder
+            self._replay_spool()
+
+    # --- Spool dosyası ---
+    def _spool(self, items):
+        with self._spool_lock:
+            with open(self.spool_path, 'a', encoding='utf-8') as f:
+                for kind, (now, *rest) in items:
+                    f.write(json.dumps([kind, now.isoformat(), *rest]) + '\n')
+            self.spooled += len(items)
+
+    def _replay_spool(self):
+        with self._spool_lock:
+            if not os.path.exists(self.spool_path):
+                return
+            # Satırlar dosya silinmeden önce parse edilir; yarım yazılmış (süreç append
+            # sırasında öldüyse) ya da bozuk satırlar .bad dosyasına ayrılır
+            items, bad = [], []
+            with open(self.spool_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        kind, now, *rest = json.loads(line)
+                        if kind not in (LOG, EVENT):
+                            raise ValueError(f'bilinmeyen tür {kind!r}')
+                        items.append((kind, (datetime.fromisoformat(now), *rest)))
+                    except (ValueError, TypeError) as e:
+                        bad.append(line if line.endswith('\n') else line + '\n')
+                        print(f"MySQL Spool: bozuk satır ayrıldı ({e})")
+            if bad:
+                with open(self.spool_path + '.bad', 'a', encoding='utf-8') as f:
+                    f.writelines(bad)
+            os.remove(self.spool_path)
+
+        for k in range(0, len(items), self.batch_size):
+            chunk = items[k:k + self.batch_size]
+            try:
+                failed = self._insert(chunk)
+            except Exception as e:  # dosya zaten silindi: kalanlar kaybolmasın
+                print(f"MySQL Spool Hatası: {e!r}")
+                failed = chunk
+            self.written += len(chunk) - len(failed)
+            if failed:
+                print("MySQL Spool Hatası: kalan kayıtlar tekrar spool'a yazıldı")
+                self._spool(failed + items[k + self.batch_size:])
+                return
+        print(f"--> MySQL Spool: {len(items)} bekleyen kayıt yazıldı.")
+
+
+class SqliteOccupancyWriter:
+    """OccupancyWriter ile aynı arayüzde, MySQL yerine SQLite'a (varsayılan: bellek içi)
+    yazan kaydedici. Replay/benchmark çalıştırmalarında kullanılır, DB'ye dokunmaz."""
+
+    def __init__(self, path=':memory:'):
+        import sqlite3
+        self.cnx = sqlite3.connect(path, check_same_thread=False)
+        self.cnx.execute("CREATE TABLE IF NOT EXISTS person_logs ("
+                         "id INTEGER PRIMARY KEY AUTOINCREMENT, record_date TEXT, "
+                         "camera_id TEXT, person_count INTEGER)")
+        self.cnx.execute("CREATE TABLE IF NOT EXISTS current_occupancy ("
+                         "camera_id TEXT PRIMARY KEY, person_count INTEGER, updated_at TEXT)")
+        self.cnx.execute("CREATE TABLE IF NOT EXISTS seat_events ("
+                         "id INTEGER PRIMARY KEY AUTOINCREMENT, event_time TEXT, camera_id TEXT, "
+                         "seat_id TEXT, state TEXT, prev_state TEXT, dwell_s REAL)")
+        self._lock = threading.Lock()
+        self.written = 0
+        self.spooled = 0
+
+    def submit(self, count, camera_id):
+        with self._lock:
+            now = datetime.now().isoformat()
+            self.cnx.execute(INSERT_LOG.replace('%s', '?'), (now, camera_id, count))
+            self.cnx.execute("INSERT OR REPLACE INTO current_occupancy VALUES (?, ?, ?)", (camera_id, count, now))
+            self.written += 1
+
+    def submit_event(self, camera_id, seat, state, prev_state, dwell_s):
+        with self._lock:
+            self.cnx.execute(INSERT_SEAT_EVENT.replace('%s', '?'),
+                             (datetime.now().isoformat(), camera_id, seat, state, prev_state, dwell_s))
+            self.written += 1
+
+    def transitions(self):
+        """{kamera: [(zaman, 0/1), ...]} kayıt sırasıyla"""
+        out = {}
+        with self._lock:
+            for now, camera_id, count in self.cnx.execute(
+                    "SELECT record_date, camera_id, person_count FROM person_logs ORDER BY id"):
+                out.setdefault(camera_id, []).append((now, count))
+        return out
+
+    def close(self, timeout=None):
+        with self._lock:
+            self.cnx.commit()
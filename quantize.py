@@ -0,0 +1,196 @@
+import json
+import time
+import argparse
+from pathlib import Path
+
+import cv2
+import numpy as np
+import onnx
+import torch
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, \
+    quantize_dynamic, quantize_static
+
+from inference_backends import OnnxRuntimeBackend
+from utils.datasets import letterbox
+from utils.general import box_iou
+from utils.metrics import ap_per_class
+
+IMG_FORMATS = ('.bmp', '.jpg', '.jpeg', '.png', '.tif', '.tiff', '.webp')
+
+
+# =========================
+#   KALİBRASYON VERİSİ
+# =========================
+
+def load_frame(im0, img_size):
+    """BGR kareyi fp32 grafiğin beklediği (1, 3, s, s) float32 girdiye çevirir."""
+    img = letterbox(im0, img_size, auto=False)[0]
+    img = np.ascontiguousarray(img[:, :, ::-1].transpose(2, 0, 1))
+    return OnnxRuntimeBackend.preprocess(img)
+
+
+class FrameCalibrationReader(CalibrationDataReader):
+    """Kütüphane kameralarından örneklenmiş karelerle statik quantization kalibrasyonu."""
+
+    def __init__(self, calib_dir, img_size, input_name, count=200):
+        files = sorted(p for p in Path(calib_dir).rglob('*') if p.suffix.lower() in IMG_FORMATS)
+        assert files, f'{calib_dir} içinde kalibrasyon karesi bulunamadı'
+        step = max(1, len(files) // count)
+        self.files = files[::step][:count]
+        self.img_size = img_size
+        self.input_name = input_name
+        self._iter = iter(self.files)
+        print(f'Kalibrasyon: {len(self.files)} kare ({calib_dir})')
+
+    def get_next(self):
+        f = next(self._iter, None)
+        if f is None:
+            return None
+        return {self.input_name: load_frame(cv2.imread(str(f)), self.img_size)}
+
+
+# =========================
+#   QUANTIZATION
+# =========================
+
+def quantize(fp32_path, int8_path, mode, calib_dir=None, img_size=640, calib_count=200):
+    """fp32 End2End grafiğini INT8'e çevirir. Sadece Conv katmanları quantize edilir;
+    kutu decode ve NMS fp32 kalır, böylece koordinat hassasiyeti kaybolmaz."""
+    t = time.time()
+    if mode == 'dynamic':
+        quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QUInt8,
+                         op_types_to_quantize=['Conv', 'MatMul'])
+    else:
+        input_name = onnx.load(str(fp32_path)).graph.input[0].name
+        reader = FrameCalibrationReader(calib_dir, img_size, input_name, calib_count)
+        quantize_static(str(fp32_path), str(int8_path), reader, quant_format=QuantFormat.QDQ,
+                        per_channel=True, activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                        op_types_to_quantize=['Conv'])
+
+    # names/stride/img_size metadata'sı quantize sırasında kaybolmasın
+    fp32_meta = {p.key: p.value for p in onnx.load(str(fp32_path)).metadata_props}
+    int8_model = onnx.load(str(int8_path))
+    existing = {p.key for p in int8_model.metadata_props}
+    for key, value in fp32_meta.items():
+        if key not in existing:
+            meta = int8_model.metadata_props.add()
+            meta.key, meta.value = key, value
+    onnx.save(int8_model, str(int8_path))
+    print(f'INT8 ({mode}) grafik: {int8_path} ({time.time() - t:.1f}s)')
+
+
+# =========================
+#   FP32 / INT8 KARŞILAŞTIRMA
+# =========================
+
+def read_clip(path, stride=1, max_frames=500):
+    cap = cv2.VideoCapture(str(path))
+    frames, n = [], 0
+    while len(frames) < max_frames:
+        ok, im0 = cap.read()
+        if not ok:
+            break
+        if n % stride == 0:
+            frames.append(im0)
+        n += 1
+    cap.release()
+    return frames
+
+
+def match_predictions(pred, target, iou_thres=0.5):
+    """test.py ile aynı eşleştirme: her hedef en fazla bir tahminle eşleşir."""
+    correct = torch.zeros(len(pred), 1, dtype=torch.bool)
+    if not len(pred) or not len(target):
+        return correct
+    for cls in torch.unique(target[:, 5]):
+        ti = (cls == target[:, 5]).nonzero(as_tuple=False).view(-1)
+        pi = (cls == pred[:, 5]).nonzero(as_tuple=False).view(-1)
+        if pi.shape[0]:
+            ious, i = box_iou(pred[pi, :4], target[ti, :4]).max(1)
+            detected = set()
+            for j in (ious > iou_thres).nonzero(as_tuple=False).view(-1):
+                d = ti[i[j]].item()
+                if d not in detected:
+                    detected.add(d)
+                    correct[pi[j]] = True
+                    if len(detected) == len(ti):
+                        break
+    return correct
+
+
+def evaluate(fp32, int8, frames, img_size, classes=None):
+    """fp32 çıktısını referans alarak INT8'in mAP@0.5, occupancy uyumu ve hızını ölçer."""
+    stats, agree = [], 0
+    t_fp32 = t_int8 = 0.0
+    for im0 in frames:
+        img = load_frame(im0, img_size)
+
+        t = time.perf_counter()
+        ref = fp32(img, classes=classes)[0]
+        t_fp32 += time.perf_counter() - t
+
+        t = time.perf_counter()
+        out = int8(img, classes=classes)[0]
+        t_int8 += time.perf_counter() - t
+
+        # Kameranın 0/1 occupancy kararı: karede en az bir insan var mı?
+        agree += int((ref[:, 5] == 0).any()) == int((out[:, 5] == 0).any())
+        stats.append((match_predictions(out, ref), out[:, 4], out[:, 5], ref[:, 5]))
+
+    tp, conf, pred_cls, target_cls = [torch.cat(x, 0).numpy() for x in zip(*stats)]
+    map50 = 0.0
+    if len(tp) and tp.any():
+        ap = ap_per_class(tp, conf, pred_cls, target_cls)[2]
+        map50 = float(ap[:, 0].mean())
+
+    n = max(len(frames), 1)
+    return {
+        'frames': len(frames),
+        'map50_vs_fp32': round(map50, 4),
+        'occupancy_agreement': round(agree / n, 4),
+        'fp32_ms': round(1E3 * t_fp32 / n, 2),
+        'int8_ms': round(1E3 * t_int8 / n, 2),
+        'speedup': round(t_fp32 / t_int8, 2) if t_int8 else None,
+    }
+
+
+# =========================
+#   MAIN
+# =========================
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--weights', nargs='+', type=str, default='yolov7.pt', help='model.pt path(s)')
+    parser.add_argument('--img-size', type=int, default=640, help='inference size (pixels)')
+    parser.add_argument('--conf-thres', type=float, default=0.25, help='object confidence threshold')
+    parser.add_argument('--iou-thres', type=float, default=0.45, help='IOU threshold for NMS')
+    parser.add_argument('--mode', type=str, default='static', choices=['static', 'dynamic'], help='quantization mode')
+    parser.add_argument('--calib-dir', type=str, default='calib_frames', help='folder of sampled library frames')
+    parser.add_argument('--calib-count', type=int, default=200, help='number of calibration frames')
+    parser.add_argument('--holdout', type=str, default='', help='held-out clip for fp32 vs int8 comparison')
+    parser.add_argument('--holdout-stride', type=int, default=5, help='use every Nth frame of the held-out clip')
+    parser.add_argument('--holdout-frames', type=int, default=300, help='max frames from the held-out clip')
+    parser.add_argument('--classes', nargs='+', type=int, help='filter by class for the comparison')
+    parser.add_argument('--onnx-cache', type=str, default='runs/onnx_cache', help='exported ONNX model cache directory')
+    parser.add_argument('--ort-threads', type=int, default=0, help='onnxruntime intra-op threads (0: all cores)')
+    opt = parser.parse_args()
+    print(opt)
+
+    # fp32 grafik detect() ile aynı önbellekten gelir (yoksa export edilir)
+    fp32 = OnnxRuntimeBackend(opt.weights, opt.img_size, opt.conf_thres, opt.iou_thres,
+                              cache_dir=opt.onnx_cache, threads=opt.ort_threads)
+    img_size = fp32.img_size
+    fp32_path = fp32.onnx_path(img_size)
+    int8_path = fp32.onnx_path(img_size, int8=True)
+
+    quantize(fp32_path, int8_path, opt.mode, opt.calib_dir, img_size, opt.calib_count)
+
+    if opt.holdout:
+        int8 = OnnxRuntimeBackend(opt.weights, img_size, opt.conf_thres, opt.iou_thres,
+                                  cache_dir=opt.onnx_cache, threads=opt.ort_threads, int8=True)
+        frames = read_clip(opt.holdout, opt.holdout_stride, opt.holdout_frames)
+        report = {'mode': opt.mode, 'int8': str(int8_path), 'holdout': opt.holdout,
+                  **evaluate(fp32, int8, frames, img_size, opt.classes)}
+        with open(Path(int8_path).with_suffix('.json'), 'w') as f:
+            json.dump(report, f, indent=2)
+        print(json.dumps(report, indent=2))
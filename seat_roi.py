@@ -0,0 +1,99 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+from utils.datasets import letterbox
+from utils.general import scale_coords
+
+
+# =========================
+#   KOLTUK / MASA ROI AYARLARI
+# =========================
+
+def load_seat_rois(path, sources):
+    """streams.txt yanındaki JSON'dan kamera bazlı koltuk poligonlarını okur.
+
+    JSON anahtarı kamera indeksi ("0") ya da streams.txt'deki kaynak olabilir:
+        {"0": [{"seat": "A1", "polygon": [[x, y], ...]}, ...], "http://...": [...]}
+    Dönen değer: {kamera_index: SeatROI}
+    """
+    if not path or not Path(path).is_file():
+        return {}
+
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    rois = {}
+    for i, src in enumerate(sources):
+        seats = config.get(str(i), config.get(str(src)))
+        if seats:
+            rois[i] = SeatROI(seats)
+    print(f"Koltuk ROI: {path} dosyasından {len(rois)} kamera için "
+          f"{sum(len(r.seats) for r in rois.values())} koltuk yüklendi.")
+    return rois
+
+
+class SeatROI:
+    """Bir kameranın koltuk poligonları ve onları kapsayan kırpma dikdörtgenleri."""
+
+    def __init__(self, seats, margin=0.15):
+        self.seats = [(str(s['seat']), np.asarray(s['polygon'], dtype=np.float32)) for s in seats]
+        self.margin = margin  # masadan taşan gövde/kafa için poligon çevresine eklenen pay
+        self.rects = []  # [(x0, y0, x1, y1)] kare boyutuna göre hesaplanır
+        self._shape = None
+
+    def _build_rects(self, shape):
+        h, w = shape[:2]
+        rects = []
+        for seat, poly in self.seats:
+            x0, y0 = poly.min(0)
+            x1, y1 = poly.max(0)
+            mx, my = (x1 - x0) * self.margin, (y1 - y0) * self.margin
+            rect = [max(0, x0 - mx), max(0, y0 - my), min(w, x1 + mx), min(h, y1 + my)]
+            if rect[2] - rect[0] < 1 or rect[3] - rect[1] < 1:
+                # Poligon kare dışında (ROI farklı çözünürlükte çizilmiş olabilir)
+                print(f'UYARI: Koltuk {seat} poligonu {w}x{h} karenin dışında, kırpma atlandı.')
+                continue
+            rects.append(rect)
+
+        # Çakışan dikdörtgenleri birleştir, aynı piksel iki kez modele gitmesin
+        merged = True
+        while merged:
+            merged = False
+            for a in range(len(rects)):
+                for b in range(a + 1, len(rects)):
+                    ra, rb = rects[a], rects[b]
+                    if ra[0] < rb[2] and rb[0] < ra[2] and ra[1] < rb[3] and rb[1] < ra[3]:
+                        rects[a] = [min(ra[0], rb[0]), min(ra[1], rb[1]), max(ra[2], rb[2]), max(ra[3], rb[3])]
+                        del rects[b]
+                        merged = True
+                        break
+                if merged:
+                    break
+
+        self.rects = [tuple(int(round(v)) for v in r) for r in rects]
+        self._shape = shape
+
+    def crops(self, im0, img_size, stride):
+        """Kareden sadece masa bölgelerini kesip letterbox'lar: [(img, crop_shape, (x0, y0))]"""
+        if self._shape != im0.shape:
+            self._build_rects(im0.shape)
+
+        out = []
+        for x0, y0, x1, y1 in self.rects:
+            crop = im0[y0:y1, x0:x1]
+            if crop.size == 0:  # yuvarlama sonrası boş kalan dikdörtgen
+                continue
+            img = letterbox(crop, img_size, auto=False, stride=stride)[0]
+            img = np.ascontiguousarray(img[:, :, ::-1].transpose(2, 0, 1))
+            out.append((img, crop.shape, (x0, y0)))
+        return out
+
+    @staticmethod
+    def to_frame(det, img_shape, crop_shape, offset):
+        """Kırpıntı üzerindeki kutuları orijinal kare koordinatlarına taşır."""
+        det[:, :4] = scale_coords(img_shape, det[:, :4], crop_shape).round()
+        det[:, [0, 2]] += offset[0]
+        det[:, [1, 3]] += offset[1]
+        return det
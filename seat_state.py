@@ -0,0 +1,91 @@
+import time
+
+import cv2
+import numpy as np
+
+# COCO sınıfları: sahibi yokken koltuğu "tutan" eşyalar
+BELONGING_CLASSES = (24, 26, 28, 63, 67, 73)  # backpack, handbag, suitcase, laptop, cell phone, book
+
+FREE, OCCUPIED, HELD, ABANDONED = 'free', 'occupied', 'held', 'abandoned'
+
+
+class SeatStateEngine:
+    """Bir kameranın koltuk bazlı durum makinesi: free / occupied / held / abandoned.
+
+    Girdi SORT çıktısıdır (0-3 kutu, 4 sınıf, 8 id). Kutu merkezleri kare boyutunda
+    rasterize edilmiş koltuk etiket haritasından tek okumayla koltuğa eşlenir, böylece
+    kare başına maliyet O(koltuk + track) olur.
+
+    - Koltukta kişi varsa: occupied
+    - Kişi `person_grace` saniyedir yok ama eşya var: held
+    - held durumunda `hold_timeout` saniye dolarsa: abandoned
+    - Ne kişi ne eşya `free_timeout` saniyedir görülmediyse: free
+
+    update() sadece durum değiştiren koltuklar için olay döndürür:
+    [(koltuk, yeni durum, önceki durum, önceki durumda geçen saniye)]
+    """
+
+    def __init__(self, seats, belongings=BELONGING_CLASSES, person_grace=3.0, hold_timeout=900.0,
+                 free_timeout=10.0):
+        self.seats = [seat for seat, _ in seats]
+        self.polygons = [poly for _, poly in seats]
+        self.belongings = np.asarray(belongings, dtype=np.int64)
+        self.person_grace = person_grace
+        self.hold_timeout = hold_timeout
+        self.free_timeout = free_timeout
+
+        n = len(self.seats)
+        self.state = [FREE] * n
+        self.since = np.full(n, np.nan)  # mevcut duruma giriş anı
+        self.person_seen = np.full(n, -np.inf)  # koltukta son kişi görülen an
+        self.item_seen = np.full(n, -np.inf)  # koltukta son eşya görülen an
+        self._labels = None  # (h, w) int16 koltuk etiket haritası, -1: koltuk yok
+
+    def _build_labels(self, shape):
+        labels = np.full(shape[:2], -1, dtype=np.int16)
+        for k, poly in enumerate(self.polygons):
+            cv2.fillPoly(labels, [np.round(poly).astype(np.int32)], k)
+        self._labels = labels
+
+    def _seat_of(self, boxes):
+        """Kutu merkezlerinin koltuk indeksleri (-1: koltuk dışı)."""
+        h, w = self._labels.shape
+        cx = np.clip(((boxes[:, 0] + boxes[:, 2]) / 2).astype(np.int64), 0, w - 1)
+        cy = np.clip(((boxes[:, 1] + boxes[:, 3]) / 2).astype(np.int64), 0, h - 1)
+        return self._labels[cy, cx]
+
+    def update(self, tracked_dets, frame_shape, now_ts=None):
+        now_ts = time.time() if now_ts is None else now_ts
+        if self._labels is None or self._labels.shape != tuple(frame_shape[:2]):
+            self._build_labels(frame_shape)
+        self.since[np.isnan(self.since)] = now_ts
+
+        if len(tracked_dets):
+            seat = self._seat_of(tracked_dets[:, :4])
+            cls = tracked_dets[:, 4].astype(np.int64)
+            self.person_seen[seat[(seat >= 0) & (cls == 0)]] = now_ts
+            self.item_seen[seat[(seat >= 0) & np.isin(cls, self.belongings)]] = now_ts
+
+        person = now_ts - self.person_seen <= self.person_grace
+        item = now_ts - self.item_seen <= self.free_timeout
+        gone = now_ts - np.maximum(self.person_seen, self.item_seen) > self.free_timeout
+
+        events = []
+        for k, old in enumerate(self.state):
+            if person[k]:
+                new = OCCUPIED
+            elif gone[k]:
+                new = FREE
+            elif item[k]:
+                new = ABANDONED if old == ABANDONED or (old == HELD and now_ts - self.since[k] >= self.hold_timeout) \
+                    else HELD
+            else:
+                new = old  # kişi yeni ayrıldı, eşya görülmedi: free_timeout dolana kadar bekle
+            if new != old:
+                events.append((self.seats[k], new, old, round(float(now_ts - self.since[k]), 1)))
+                self.state[k] = new
+                self.since[k] = now_ts
+        return events
+
+    def states(self):
+        return dict(zip(self.seats, self.state))
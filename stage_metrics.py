@@ -0,0 +1,106 @@
+import json
+import time
+import threading
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+# Döngüdeki aşamalar, log ve Prometheus çıktısında bu sırayla görünür
+STAGES = ('frame_age', 'capture_wait', 'preprocess', 'inference', 'nms', 'tracking', 'overlay', 'db_enqueue', 'video_write')
+QUANTILES = (50, 95, 99)
+
+
+class StageMetrics:
+    """Kamera ve aşama bazlı gecikme ölçümleri (p50/p95/p99).
+
+    Her (kamera, aşama) için son `window` ölçüm bir halkada tutulur. `log_interval`
+    saniyede bir özet tek satır JSON olarak basılır. `port` verilirse özet
+    127.0.0.1:port/metrics adresinden Prometheus text formatında da sunulur.
+    """
+
+    def __init__(self, window=1000, log_interval=10.0, port=0):
+        self.window = window
+        self.log_interval = log_interval
+        self._samples = defaultdict(lambda: deque(maxlen=window))  # {(kamera, aşama): deque[ms]}
+        self._lock = threading.Lock()
+        self._last_log = time.time()
+
+        self.server = None
+        if port:
+            self.server = ThreadingHTTPServer(('127.0.0.1', port), _handler(self))
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+            print(f'Metrikler: http://127.0.0.1:{port}/metrics')
+
+    def record(self, camera, stage, seconds):
+        with self._lock:
+            self._samples[(str(camera), stage)].append(1E3 * seconds)
+
+    def record_many(self, cameras, stage, seconds):
+        """Batch aşamaları (inference, nms, ...) batch'teki her kameraya aynı süreyle yazılır."""
+        for camera in cameras:
+            self.record(camera, stage, seconds)
+
+    def summary(self):
+        """{kamera: {aşama: {'p50': ms, 'p95': ms, 'p99': ms, 'count': n}}}"""
+        with self._lock:
+            samples = {k: np.fromiter(v, dtype=np.float64) for k, v in self._samples.items() if len(v)}
+
+        out = {}
+        for (camera, stage), arr in sorted(samples.items(), key=lambda kv: (kv[0][0], _stage_order(kv[0][1]))):
+            qs = np.percentile(arr, QUANTILES)
+            out.setdefault(camera, {})[stage] = {
+                **{f'p{q}': round(float(v), 3) for q, v in zip(QUANTILES, qs)},
+                'count': int(arr.size),
+            }
+        return out
+
+    def maybe_log(self):
+        now_ts = time.time()
+        if self.log_interval and now_ts - self._last_log >= self.log_interval:
+            self._last_log = now_ts
+            print(json.dumps({'ts': round(now_ts, 3), 'stage_latency_ms': self.summary()}))
+
+    def prometheus_text(self):
+        lines = [
+            '# HELP libtrack_stage_latency_ms Per-camera detection loop stage latency in milliseconds.',
+            '# TYPE libtrack_stage_latency_ms summary',
+        ]
+        for camera, stages in self.summary().items():
+            cam = camera.replace('\\', '\\\\').replace('"', '\\"')
+            for stage, st in stages.items():
+                for q in QUANTILES:
+                    lines.append(f'libtrack_stage_latency_ms{{camera="{cam}",stage="{stage}",quantile="{q / 100}"}} '
+                                 f'{st[f"p{q}"]}')
+                lines.append(f'libtrack_stage_latency_ms_count{{camera="{cam}",stage="{stage}"}} {st["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()  # dinleyen soketi de bırak, aynı süreçte port tekrar açılabilsin
+            self.server = None
+
+
+def _stage_order(stage):
+    return STAGES.index(stage) if stage in STAGES else len(STAGES)
+
+
+def _handler(metrics):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # her istek için konsola log basma
+
+    return MetricsHandler
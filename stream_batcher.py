@@ -0,0 +1,334 @@
+import os
+import time
+import threading
+
+import cv2
+import numpy as np
+
+from utils.datasets import LoadStreams, letterbox
+from utils.general import clean_str
+
+
+# =========================
+#   KAMERA YAKALAMA THREAD'İ
+# =========================
+
+class _CameraReader:
+    """Tek bir kameradan sürekli kare okur, letterbox'lar ve en yeni kareyi saklar.
+
+    Scheduler almadan üzerine yazılan kareler `dropped` sayacına eklenir. Canlı
+    yayınlarda OpenCV'nin iç tamponu 1 kareye indirilir; video dosyaları kendi
+    FPS'inde okunur ki dosya tekrarları canlı kamera gibi davransın.
+    """
+
+    def __init__(self, index, source, img_size, stride, notify):
+        self.index = index
+        self.source = source
+        self.img_size = img_size
+        self.stride = stride
+        self.notify = notify  # yeni kare geldiğinde scheduler'ı uyandıran Condition
+
+        self.im0 = None  # orijinal kare (BGR, HWC)
+        self.img = None  # letterbox'lanmış kare (RGB, CHW)
+        self.t_capture = 0.0  # en yeni karenin okunduğu an
+        self.seq = 0  # okunan kare sayacı
+        self.consumed_seq = 0  # scheduler'ın en son aldığı kare
+        self.dropped = 0  # hiç işlenmeden yerine yenisi gelen kareler
+        self.alive = True
+
+        cap_source = eval(source) if source.isnumeric() else source
+        self.live = source.isnumeric() or source.lower().startswith(('rtsp://', 'rtmp://', 'http://', 'https://'))
+        self.cap = cv2.VideoCapture(cap_source)
+        assert self.cap.isOpened(), f'Failed to open {source}'
+        if self.live:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # sürücü tamponunda bayat kare birikmesin
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) % 100 or 30
+
+        self.thread = threading.Thread(target=self._update, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _update(self):
+        t_next = time.time()
+        while self.alive and self.cap.isOpened():
+            if not self.live:
+                t_next += 1 / self.fps
+                time.sleep(max(0.0, t_next - time.time()))
+            success, im0 = self.cap.read()
+            if not success:
+                break
+            t_capture = time.time()
+
+            # Ön işleme ana döngüde değil, kameranın kendi thread'inde yapılır
+            img = letterbox(im0, self.img_size, auto=True, stride=self.stride)[0]
+            img = np.ascontiguousarray(img[:, :, ::-1].transpose(2, 0, 1))
+
+            with self.notify:
+                if self.ready():
+                    self.dropped += 1
+                self.im0, self.img, self.t_capture = im0, img, t_capture
+                self.seq += 1
+                self.notify.notify_all()
+
+        with self.notify:
+            self.alive = False
+            self.notify.notify_all()
+
+    def ready(self):
+        return self.seq > self.consumed_seq
+
+    def take(self):
+        self.consumed_seq = self.seq
+        return self.img, self.im0, self.t_capture
+
+
+# =========================
+#   EKRANSIZ LOADSTREAMS
+# =========================
+
+class HeadlessLoadStreams(LoadStreams):
+    """LoadStreams'in aynısı, sadece her karede cv2.waitKey ile 'q' kontrolü yapmaz.
+
+    --headless'ta yakalama davranışı (tüm kameraları bekleyen senkron batch) değişmesin
+    ama pencere olmayan sunucuda HighGUI çağrılmasın diye kullanılır.
+    """
+
+    def __next__(self):
+        self.count += 1
+        img0 = self.imgs.copy()
+        img = [letterbox(x, self.img_size, auto=self.rect, stride=self.stride)[0] for x in img0]
+        img = np.stack(img, 0)
+        img = img[:, :, :, ::-1].transpose(0, 3, 1, 2)  # BGR -> RGB, BHWC -> BCHW
+        img = np.ascontiguousarray(img)
+        return self.sources, img, img0, None
+
+
+# =========================
+#   BATCH SCHEDULER
+# =========================
+
+class BatchedStreams:
+    """LoadStreams yerine geçen, deadline tabanlı çoklu kamera batch'leyicisi.
+
+    Her kamera kendi thread'inde okunur ve ön işlenir. Scheduler ilk hazır kareyi
+    gördükten sonra en fazla `deadline` saniye diğer kameraları bekler, o ana kadar
+    hazır olanları tek bir tensörde toplar. Böylece en yavaş kamera döngünün hızını
+    belirlemez. Farklı letterbox boyutundaki kameralar ayrı batch'lerde döner.
+
+    Dönen değer LoadStreams ile aynıdır: (paths, img, im0s, None). Batch'teki karelerin
+    kamera indeksleri `batch_indices`, okunma anları `batch_times` özelliğinde tutulur.
+    Her zaman kameranın en yeni karesi döner; arada kalanlar atılır ve kamera bazlı
+    `dropped` sayacında görünür.
+    """
+
+    def __init__(self, sources='streams.txt', img_size=640, stride=32, deadline=0.05, check_quit=True):
+        self.mode = 'stream'
+        self.check_quit = check_quit  # False: ekran yok, her karede cv2.waitKey çağrılmaz
+        self.img_size = img_size
+        self.stride = stride
+        self.deadline = deadline
+
+        if os.path.isfile(sources):
+            with open(sources, 'r') as f:
+                sources = [x.strip() for x in f.read().strip().splitlines() if len(x.strip())]
+        else:
+            sources = [sources]
+
+        self.sources = [clean_str(x) for x in sources]
+        self.count = 0
+        self.batch_indices = []
+        self.batch_times = []
+        self._pending = []  # aynı turda toplanmış, henüz dönmemiş batch'ler
+
+        self._cond = threading.Condition()
+        self.readers = []
+        for i, s in enumerate(sources):
+            reader = _CameraReader(i, s, img_size, stride, self._cond)
+            print(f'{i + 1}/{len(sources)}: {s}... success ({reader.fps:.0f} FPS).')
+            self.readers.append(reader)
+        for reader in self.readers:
+            reader.start()
+        print('')
+
+    def __iter__(self):
+        self.count = -1
+        return self
+
+    def _collect(self):
+        """Deadline dolana ya da tüm canlı kameralar hazır olana kadar bekler."""
+        with self._cond:
+            # En az bir kamera hazır olana kadar bekle
+            while not any(r.ready() for r in self.readers):
+                if not any(r.alive for r in self.readers):
+                    raise StopIteration
+                self._cond.wait(timeout=1.0)
+
+            t_end = time.time() + self.deadline
+            while True:
+                alive = [r for r in self.readers if r.alive or r.ready()]
+                if all(r.ready() for r in alive):
+                    break
+                remain = t_end - time.time()
+                if remain <= 0:
+                    break
+                self._cond.wait(timeout=remain)
+
+            return [(r.index, *r.take()) for r in self.readers if r.ready()]
+
+    def __next__(self):
+        self.count += 1
+        if self.check_quit and cv2.waitKey(1) == ord('q'):
+            cv2.destroyAllWindows()
+            raise StopIteration
+
+        if not self._pending:
+            # Aynı boyuttaki kareleri tek batch'te topla
+            groups = {}
+            for index, img, im0, t_capture in self._collect():
+                groups.setdefault(img.shape, []).append((index, img, im0, t_capture))
+            self._pending = list(groups.values())
+
+        batch = self._pending.pop(0)
+        self.batch_indices = [b[0] for b in batch]
+        self.batch_times = [b[3] for b in batch]
+        img = np.stack([b[1] for b in batch], 0)
+        im0s = [b[2] for b in batch]
+        paths = [self.sources[index] for index in self.batch_indices]
+        return paths, img, im0s, None
+
+    @property
+    def dropped(self):
+        """{kamera indeksi: atılan kare sayısı}"""
+        return {r.index: r.dropped for r in self.readers}
+
+    def set_img_size(self, index, img_size):
+        """Kameranın letterbox boyutunu değiştirir; bir sonraki kareden itibaren geçerlidir."""
+        self.readers[index].img_size = img_size
+
+    def __len__(self):
+        return 0  # canlı yayınların sonu yok
+
+
+# =========================
+#   OFFLINE REPLAY
+# =========================
+
+class ReplayStreams:
+    """Kayıtlı klipleri (ya da sentetik kareleri) sabit FPS'te N sanal kamera olarak oynatır.
+
+    Kareler baştan decode edilip letterbox'lanır, böylece ölçülen süre sadece detect()
+    döngüsüne aittir. Saat gerçek zamanlıdır: döngü FPS'e yetişemezse aradaki kareler
+    atılır ve `dropped` sayacında görünür, yetişirse bir sonraki kare beklenir.
+    Dönen değer BatchedStreams ile aynıdır.
+    """
+
+    def __init__(self, clips=(), streams=4, fps=15.0, img_size=640, stride=32, duration=30.0,
+                 max_frames=300, synthetic_shape=(720, 1280)):
+        self.mode = 'stream'
+        self.fps = fps
+        self.duration = duration
+        self.sources = [f'replay{k}' for k in range(streams)]
+        self.count = 0
+        self.batch_indices = []
+        self.batch_times = []
+        self._pending = []
+
+        if clips:
+            self.clips = [self._read(c, max_frames) for c in clips]
+        else:
+            self.clips = [self._synthetic(synthetic_shape, max_frames)]
+        self.stride = stride
+        self._letterboxed = {}  # {(klip, img_size): [img, ...]}
+        # Kameralar klipleri sırayla paylaşır, aynı klibi oynayanlar farklı yerden başlar
+        self.clip_of = [k % len(self.clips) for k in range(streams)]
+        self.img_sizes = [None] * streams
+        for k in range(streams):
+            self.set_img_size(k, img_size)
+        self.offsets = [(k // len(self.clips)) * len(self.clips[self.clip_of[k]]) // max(1, streams)
+                        for k in range(streams)]
+        self._dropped = [0] * streams
+        self.served = 0
+        print(f'Replay: {streams} kamera, {fps:g} FPS, {len(self.clips)} klip x {len(self.clips[0])} kare')
+
+    @staticmethod
+    def _read(path, max_frames):
+        cap = cv2.VideoCapture(str(path))
+        frames = []
+        while len(frames) < max_frames:
+            ok, im0 = cap.read()
+            if not ok:
+                break
+            frames.append(im0)
+        cap.release()
+        assert frames, f'Failed to read {path}'
+        return frames
+
+    @staticmethod
+    def _synthetic(shape, n):
+        """Gürültülü arka planda gezinen dikdörtgenler; hareket kontrolü ve tracker için yeterli."""
+        rng = np.random.default_rng(0)
+        h, w = shape
+        base = rng.integers(90, 140, (h, w, 3), dtype=np.uint8)
+        frames = []
+        for k in range(n):
+            im0 = base.copy()
+            x = int((w - w // 8) * (0.5 + 0.5 * np.sin(2 * np.pi * k / n)))
+            cv2.rectangle(im0, (x, h // 3), (x + w // 8, h // 3 + h // 3), (40, 60, 200), -1)
+            frames.append(im0)
+        return frames
+
+    def set_img_size(self, index, img_size):
+        """BatchedStreams.set_img_size ile aynı; klibin o boyuttaki letterbox'ı bir kez hazırlanır."""
+        key = (self.clip_of[index], img_size)
+        if key not in self._letterboxed:
+            self._letterboxed[key] = [
+                np.ascontiguousarray(letterbox(im0, img_size, auto=True, stride=self.stride)[0][:, :, ::-1]
+                                     .transpose(2, 0, 1)) for im0 in self.clips[key[0]]]
+        self.img_sizes[index] = img_size
+
+    def __iter__(self):
+        self.count = -1
+        self._t0 = time.time()
+        self._tick = -1
+        return self
+
+    def __next__(self):
+        self.count += 1
+        if not self._pending:
+            elapsed = time.time() - self._t0
+            if elapsed >= self.duration:
+                raise StopIteration
+            tick = int(elapsed * self.fps)
+            if tick <= self._tick:
+                tick = self._tick + 1
+                if tick / self.fps >= self.duration:
+                    raise StopIteration
+                time.sleep(max(0.0, self._t0 + tick / self.fps - time.time()))
+            for k in range(len(self.clip_of)):
+                self._dropped[k] += tick - self._tick - 1
+            self._tick = tick
+
+            groups = {}
+            for k, c in enumerate(self.clip_of):
+                frame = (tick + self.offsets[k]) % len(self.clips[c])
+                img = self._letterboxed[(c, self.img_sizes[k])][frame]
+                groups.setdefault(img.shape, []).append((k, img, self.clips[c][frame]))
+            self._pending = list(groups.values())
+            self.served += len(self.clip_of)
+
+        batch = self._pending.pop(0)
+        self.batch_indices = [b[0] for b in batch]
+        self.batch_times = [self._t0 + self._tick / self.fps] * len(batch)
+        img = np.stack([b[1] for b in batch], 0)
+        im0s = [b[2] for b in batch]
+        paths = [self.sources[k] for k in self.batch_indices]
+        return paths, img, im0s, None
+
+    @property
+    def dropped(self):
+        """{kamera indeksi: atılan kare sayısı}"""
+        return dict(enumerate(self._dropped))
+
+    def __len__(self):
+        return 0
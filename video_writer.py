@@ -0,0 +1,109 @@
+import queue
+import threading
+
+import cv2
+
+
+def _stop_thread(q, thread, timeout):
+    """Bitiş işaretini bırakıp thread'i bekler. Thread ölmüşse ve kuyruk doluysa
+    put() sonsuza kadar bloklamasın diye beklemeler sınırlıdır."""
+    if thread.is_alive():
+        try:
+            q.put(None, timeout=timeout)
+        except queue.Full:
+            print('UYARI: kayıt thread\'i yanıt vermiyor, kuyruktaki kareler atlandı')
+            return
+    thread.join(timeout=timeout)
+
+
+class AsyncVideoWriter:
+    """cv2.VideoWriter'ı arka plan thread'inde çalıştıran kaydedici.
+
+    Döngü write() ile kareyi sınırlı bir kuyruğa bırakır; encode ayrı thread'de yapılır
+    (OpenCV encode sırasında GIL'i bırakır). `every` ile her N. kare yazılır, `scale` ile
+    çıktı küçültülür (resize de thread'de yapılır). Kuyruk doluysa kare düşürülür;
+    `drop_if_full=False` ise döngü yer açılana kadar bekler. write()'a verilen kare
+    sonradan değiştirilmemelidir, kopyalanmadan kuyruğa girer.
+    """
+
+    def __init__(self, path, fps, size, fourcc='mp4v', every=1, scale=1.0, queue_size=32, drop_if_full=True):
+        self.path = path
+        self.every = max(1, every)
+        self.scale = scale
+        self.drop_if_full = drop_if_full
+        w, h = size
+        self.size = (int(w * scale) // 2 * 2, int(h * scale) // 2 * 2)  # çoğu codec çift boyut ister
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps / self.every, self.size)
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.frames = 0  # write() çağrısı
+        self.written = 0
+        self.dropped = 0  # kuyruk dolu olduğu için yazılmayan
+        self._closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self, frame):
+        self.frames += 1
+        if (self.frames - 1) % self.every:
+            return
+        try:
+            if self.drop_if_full:
+                self.queue.put_nowait(frame)
+            else:
+                self.queue.put(frame)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        try:
+            while True:
+                frame = self.queue.get()
+                if frame is None:
+                    break
+                if frame.shape[1::-1] != self.size:
+                    frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+                self.writer.write(frame)
+                self.written += 1
+        finally:
+            self.writer.release()  # encode hatasında da dosya kapanır
+
+    def close(self, timeout=30.0):
+        """Kuyruktakileri yazıp dosyayı kapatır."""
+        if self._closed:
+            return
+        self._closed = True
+        _stop_thread(self.queue, self.thread, timeout)
+        print(f'Video: {self.path} {self.written} kare yazıldı, {self.dropped} kare düşürüldü')
+
+
+class AsyncImageWriter:
+    """cv2.imwrite'ı arka plan thread'inde çalıştırır (LoadImages görüntü modu için)."""
+
+    def __init__(self, queue_size=32, drop_if_full=True):
+        self.drop_if_full = drop_if_full
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self, path, frame):
+        try:
+            if self.drop_if_full:
+                self.queue.put_nowait((path, frame))
+            else:
+                self.queue.put((path, frame))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            cv2.imwrite(*item)
+            self.written += 1
+
+    def close(self, timeout=30.0):
+        _stop_thread(self.queue, self.thread, timeout)
@@ -0,0 +1,172 @@
+import numpy as np
+
+try:
+    import lap
+    HAS_LAP = True
+except ImportError:
+    from scipy.optimize import linear_sum_assignment
+    HAS_LAP = False
+
+
+# sort.KalmanBoxTracker ile aynı sabit hızlı model: [x, y, s, r, x', y', s']
+_F = np.eye(7)
+_F[0, 4] = _F[1, 5] = _F[2, 6] = 1.0
+_Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001])
+_R = np.diag([1.0, 1.0, 10.0, 10.0])
+_P0 = np.diag([10.0, 10.0, 10.0, 10.0, 10000.0, 10000.0, 10000.0])
+_I = np.eye(7)
+
+
+def linear_assignment(cost_matrix):
+    """sort.py ile aynı çözücü seçimi (lap varsa lapjv, yoksa scipy), eşitlikler de aynı bozulsun diye."""
+    if HAS_LAP:
+        _, x, y = lap.lapjv(cost_matrix, extend_cost=True)
+        return np.array([[y[i], i] for i in x if i >= 0], dtype=int).reshape(-1, 2)
+    x, y = linear_sum_assignment(cost_matrix)
+    return np.stack((x, y), 1)
+
+
+def iou_batch(bb_test, bb_gt):
+    """(n, 4) x (m, 4) -> (n, m) IoU matrisi."""
+    bb_gt = bb_gt[None]
+    bb_test = bb_test[:, None]
+    xx1 = np.maximum(bb_test[..., 0], bb_gt[..., 0])
+    yy1 = np.maximum(bb_test[..., 1], bb_gt[..., 1])
+    xx2 = np.minimum(bb_test[..., 2], bb_gt[..., 2])
+    yy2 = np.minimum(bb_test[..., 3], bb_gt[..., 3])
+    wh = np.maximum(0., xx2 - xx1) * np.maximum(0., yy2 - yy1)
+    return wh / ((bb_test[..., 2] - bb_test[..., 0]) * (bb_test[..., 3] - bb_test[..., 1])
+                 + (bb_gt[..., 2] - bb_gt[..., 0]) * (bb_gt[..., 3] - bb_gt[..., 1]) - wh)
+
+
+def bbox_to_z(bbox):
+    """(n, 4+) [x1, y1, x2, y2] -> (n, 4) [cx, cy, alan, en/boy]"""
+    w = bbox[:, 2] - bbox[:, 0]
+    h = bbox[:, 3] - bbox[:, 1]
+    return np.stack((bbox[:, 0] + w / 2., bbox[:, 1] + h / 2., w * h, w / h), 1)
+
+
+def x_to_bbox(x):
+    """(n, 7+) durum -> (n, 4) [x1, y1, x2, y2]"""
+    w = np.sqrt(x[:, 2] * x[:, 3])
+    h = x[:, 2] / w
+    return np.stack((x[:, 0] - w / 2., x[:, 1] - h / 2., x[:, 0] + w / 2., x[:, 1] + h / 2.), 1)
+
+
+def associate(dets, trks, iou_threshold=0.3):
+    """sort.associate_detections_to_trackers'ın aynısı; eşleşmeyen tespitlerin sırası
+    (dolayısıyla yeni ID'lerin sırası) da aynıdır."""
+    if len(trks) == 0:
+        return np.empty((0, 2), dtype=int), np.arange(len(dets)), np.empty((0,), dtype=int)
+
+    iou = iou_batch(dets[:, :4], trks[:, :4])
+    if min(iou.shape) > 0:
+        a = (iou > iou_threshold).astype(np.int32)
+        if a.sum(1).max() == 1 and a.sum(0).max() == 1:
+            matched = np.stack(np.where(a), axis=1)
+        else:
+            matched = linear_assignment(-iou)
+    else:
+        matched = np.empty((0, 2), dtype=int)
+
+    ok = iou[matched[:, 0], matched[:, 1]] >= iou_threshold
+    in_d = np.zeros(len(dets), dtype=bool)
+    in_d[matched[:, 0]] = True
+    in_t = np.zeros(len(trks), dtype=bool)
+    in_t[matched[:, 1]] = True
+    unmatched_dets = np.concatenate((np.flatnonzero(~in_d), matched[~ok, 0])).astype(int)
+    unmatched_trks = np.concatenate((np.flatnonzero(~in_t), matched[~ok, 1])).astype(int)
+    return matched[ok], unmatched_dets, unmatched_trks
+
+
+class VectorSort:
+    """sort.Sort'un yerine geçen, bir kameranın tüm track'lerini bitişik numpy dizilerinde
+    tutan tracker.
+
+    Kalman predict/update tüm track'ler için tek seferde (batch matris çarpımlarıyla)
+    yapılır; filterpy ile aynı Joseph formu kullanılır. Girdi/çıktı sort.Sort ile aynıdır:
+    (n, 6) [x1, y1, x2, y2, conf, cls] -> (k, 9) [x1, y1, x2, y2, cls, u', v', s', id].
+    Çıktı sırası ve ID'ler de aynıdır; ID sayacı sort.KalmanBoxTracker.count gibi tüm
+    kameralar arasında ortaktır.
+    """
+
+    count = 0
+
+    def __init__(self, max_age=1, min_hits=3, iou_threshold=0.3):
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.iou_threshold = iou_threshold
+        self.frame_count = 0
+
+        self.x = np.zeros((0, 7))
+        self.P = np.zeros((0, 7, 7))
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.detclass = np.zeros(0)
+        self.time_since_update = np.zeros(0, dtype=np.int64)
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.hit_streak = np.zeros(0, dtype=np.int64)
+        self.age = np.zeros(0, dtype=np.int64)
+
+    _fields = ('x', 'P', 'ids', 'detclass', 'time_since_update', 'hits', 'hit_streak', 'age')
+
+    def _keep(self, mask):
+        for f in self._fields:
+            setattr(self, f, getattr(self, f)[mask])
+
+    def _predict(self):
+        x = self.x
+        x[(x[:, 6] + x[:, 2]) <= 0, 6] = 0.0
+        self.x = x @ _F.T
+        self.P = _F @ self.P @ _F.T + _Q
+        self.age += 1
+        self.hit_streak[self.time_since_update > 0] = 0
+        self.time_since_update += 1
+        return x_to_bbox(self.x)
+
+    def _update(self, ti, z):
+        x, P = self.x[ti], self.P[ti]
+        y = z - x[:, :4]
+        S = P[:, :4, :4] + _R
+        K = P[:, :, :4] @ np.linalg.inv(S)  # (n, 7, 4)
+        x = x + (K @ y[..., None])[..., 0]
+        I_KH = _I - np.concatenate((K, np.zeros((len(ti), 7, 3))), 2)
+        P = I_KH @ P @ I_KH.transpose(0, 2, 1) + K @ _R @ K.transpose(0, 2, 1)
+        self.x[ti], self.P[ti] = x, P
+
+    def _add(self, dets):
+        n = len(dets)
+        x = np.zeros((n, 7))
+        x[:, :4] = bbox_to_z(dets)
+        self.x = np.concatenate((self.x, x))
+        self.P = np.concatenate((self.P, np.broadcast_to(_P0, (n, 7, 7))))
+        self.ids = np.concatenate((self.ids, VectorSort.count + np.arange(n)))
+        VectorSort.count += n
+        self.detclass = np.concatenate((self.detclass, dets[:, 5]))
+        zeros = np.zeros(n, dtype=np.int64)
+        for f in ('time_since_update', 'hits', 'hit_streak', 'age'):
+            setattr(self, f, np.concatenate((getattr(self, f), zeros)))
+
+    def update(self, dets=np.empty((0, 6))):
+        self.frame_count += 1
+        pos = self._predict()
+        valid = ~np.isnan(pos).any(1)
+        if not valid.all():
+            self._keep(valid)
+            pos = pos[valid]
+
+        matched, unmatched_dets, _ = associate(dets, pos, self.iou_threshold)
+        if len(matched):
+            di, ti = matched[:, 0], matched[:, 1]
+            self._update(ti, bbox_to_z(dets[di]))
+            self.time_since_update[ti] = 0
+            self.hits[ti] += 1
+            self.hit_streak[ti] += 1
+            self.detclass[ti] = dets[di, 5]
+        if len(unmatched_dets):
+            self._add(dets[unmatched_dets])
+
+        out = (self.time_since_update < 1) & ((self.hit_streak >= self.min_hits) | (self.frame_count <= self.min_hits))
+        ret = np.concatenate((x_to_bbox(self.x), self.detclass[:, None], self.x[:, 4:7], self.ids[:, None] + 1), 1)
+        ret = ret[out][::-1]
+        self._keep(self.time_since_update <= self.max_age)
+        return ret if len(ret) else np.empty((0, 6))